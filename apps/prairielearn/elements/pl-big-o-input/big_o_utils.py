@@ -30,6 +30,13 @@ THETA_LOWER_ORDER_TERMS_FEEDBACK = (
 )
 
 
+def is_equivalent(sym_true: sympy.Expr, sym_sub: sympy.Expr) -> bool:
+    # Skip the slow symbolic comparison if the expressions clearly differ.
+    if psu.find_numeric_counterexample(sym_true, sym_sub) is not None:
+        return False
+    return bool(sym_true.equals(sym_sub))
+
+
 def grade_o_expression(
     a_true: str, a_sub: str, variables: list[str]
 ) -> tuple[float, str]:
@@ -48,7 +55,7 @@ def grade_o_expression(
         return (1, CORRECT_UNCONDITIONAL_FEEDBACK)
 
     try:
-        if sym_true.equals(sym_sub):
+        if is_equivalent(sym_true, sym_sub):
             return (1.0, CORRECT_COMPLEX_FEEDBACK)
 
         elif sympy.limit(sym_sub, sympy.Symbol(variables[0]), sympy.oo) < sympy.sympify(
@@ -92,7 +99,7 @@ def grade_theta_expression(
         return (1, CORRECT_UNCONDITIONAL_FEEDBACK)
 
     try:
-        if sym_true.equals(sym_sub):
+        if is_equivalent(sym_true, sym_sub):
             return (1.0, CORRECT_COMPLEX_FEEDBACK)
 
         elif sympy.limit(sym_sub, sympy.Symbol(variables[0]), sympy.oo) < sympy.sympify(
@@ -137,7 +144,7 @@ def grade_omega_expression(
         return (1, CORRECT_UNCONDITIONAL_FEEDBACK)
 
     try:
-        if sym_true.equals(sym_sub):
+        if is_equivalent(sym_true, sym_sub):
             return (1, CORRECT_COMPLEX_FEEDBACK)
 
         elif sympy.limit(sym_sub, sympy.Symbol(variables[0]), sympy.oo) < sympy.sympify(
@@ -761,6 +761,10 @@ def grade(element_html: str, data: pl.QuestionData) -> None:
             assert isinstance(a_sub_sympy, sympy.Expr)
             assert isinstance(a_tru_sympy, sympy.Expr)
 
+        # Comparing the expressions symbolically can take seconds, so answers
+        # that are clearly wrong are rejected first.
+        if psu.find_numeric_counterexample(a_tru_sympy, a_sub_sympy) is not None:
+            return False, None
         return a_tru_sympy.equals(a_sub_sympy) is True, None
 
     try:
@@ -128,7 +128,7 @@ def prepare(element_html: str, data: pl.QuestionData) -> None:
 
     # In with-units mode, absolute tolerance must have units. Otherwise just a float
     if grading_mode is GradingMode.WITH_UNITS:
-        parsed_atol = ureg.Quantity(get_with_units_atol(element, data, ureg))
+        parsed_atol = pl.parse_quantity(get_with_units_atol(element, data, ureg))
         if parsed_atol.dimensionless:
             atol = pl.get_string_attrib(element, "atol")
             raise ValueError(
@@ -149,8 +149,8 @@ def prepare(element_html: str, data: pl.QuestionData) -> None:
                 f'"magnitude-partial-credit" must be in the range [0.0, 1.0], not {partial_credit}'
             )
 
-        if correct_answer != "":
-            correct_answer_parsed = ureg.Quantity(correct_answer)
+        if correct_answer is not None and correct_answer != "":
+            correct_answer_parsed = pl.parse_quantity(str(correct_answer))
 
             if not correct_answer_parsed.check(parsed_atol.dimensionality):
                 raise ValueError(
@@ -159,7 +159,7 @@ def prepare(element_html: str, data: pl.QuestionData) -> None:
                 )
     else:
         atol = pl.get_string_attrib(element, "atol", ATOL_DEFAULT)
-        parsed_atol = ureg.Quantity(atol)
+        parsed_atol = pl.parse_quantity(atol)
         if not parsed_atol.dimensionless:
             raise ValueError(
                 f'"atol" attribute "{atol}" may only have units in with-units grading.'
@@ -273,7 +273,7 @@ def render(element_html: str, data: pl.QuestionData) -> str:
             if a_sub == "":
                 html_params["a_sub"] = a_sub
             else:
-                a_sub_parsed = ureg.Quantity(a_sub)
+                a_sub_parsed = pl.parse_quantity(a_sub)
                 html_params["a_sub"] = prepare_display_string(
                     a_sub_parsed, custom_format, grading_mode
                 )
@@ -312,7 +312,7 @@ def render(element_html: str, data: pl.QuestionData) -> str:
         if a_tru is None:
             return ""
         if a_tru != "":
-            a_tru_parsed = ureg.Quantity(a_tru)
+            a_tru_parsed = pl.parse_quantity(a_tru)
             a_tru = prepare_display_string(a_tru_parsed, custom_format, grading_mode)
 
         html_params = {
@@ -359,11 +359,9 @@ def parse(element_html: str, data: pl.QuestionData) -> None:
             data["submitted_answers"][name] = None
             return
 
-    ureg = pl.get_unit_registry()
-
     # checks for invalids by parsing as a dimensionful quantity
     try:
-        a_sub_parsed = ureg.Quantity(a_sub)
+        a_sub_parsed = pl.parse_quantity(a_sub)
     except errors.UndefinedUnitError:  # incorrect units
         data["format_errors"][name] = "Invalid unit."
         return
@@ -0,0 +1,95 @@
+"""
+Compare the cost of decoding a request and encoding a response with
+numeric-heavy `params` in the zygote, before and after integers were left to
+the C JSON parser and the check for integers that JavaScript can't represent
+stopped visiting every value unless the encoded JSON might contain one.
+
+Run from `apps/prairielearn/python`:
+
+    python -m benchmarks.json_benchmark
+"""
+
+import json
+import random
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+import prairielearn as pl
+import prairielearn.internal.zygote_utils as zu
+
+
+def make_data(size: int) -> dict[str, Any]:
+    rng = random.Random(0)
+    return {
+        "params": {
+            "matrix": [[rng.random() for _ in range(size)] for _ in range(size)],
+            "int_matrix": [
+                [rng.randint(-1000, 1000) for _ in range(size)] for _ in range(size)
+            ],
+            "points": [
+                {"x": rng.randint(0, 100), "y": rng.random(), "label": f"p{i}"}
+                for i in range(size * 10)
+            ],
+        },
+        "correct_answers": {"x": 1.5},
+        "variant_seed": 1234,
+        "options": {},
+    }
+
+
+def legacy_assert_all_integers_within_limits(item: Any) -> None:
+    item_stack = [item]
+    while item_stack:
+        next_item = item_stack.pop()
+        if isinstance(next_item, int):
+            if not pl.is_int_json_serializable(next_item):
+                raise ValueError(
+                    f"Data structure contains oversized integer: {next_item}"
+                )
+        elif isinstance(next_item, list):
+            item_stack.extend(next_item)
+        elif isinstance(next_item, dict):
+            item_stack.extend(next_item.keys())
+            item_stack.extend(next_item.values())
+
+
+def legacy_encode(obj: Any) -> str:
+    legacy_assert_all_integers_within_limits(obj)
+    return json.dumps(obj, allow_nan=False)
+
+
+def encode(obj: Any) -> str:
+    json_str = json.dumps(obj, allow_nan=False)
+    if zu.may_contain_oversized_integer(json_str):
+        zu.assert_all_integers_within_limits(obj)
+    return json_str
+
+
+def best_ms(fn: Callable[[], Any], number: int = 10) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000
+
+
+def main() -> None:
+    for size in (10, 100, 300):
+        request = json.dumps(make_data(size))
+        data = json.loads(request, parse_int=zu.safe_parse_int)
+        assert zu.parse_json(request) == data
+        assert encode(data) == legacy_encode(data)
+        print(f"params with {size}x{size} matrices ({len(request) // 1024} KiB):")
+        timings = {
+            "decode": (
+                best_ms(lambda: json.loads(request, parse_int=zu.safe_parse_int)),  # noqa: B023
+                best_ms(lambda: zu.parse_json(request)),  # noqa: B023
+            ),
+            "encode": (
+                best_ms(lambda: legacy_encode(data)),  # noqa: B023
+                best_ms(lambda: encode(data)),  # noqa: B023
+            ),
+        }
+        for label, (legacy, current) in timings.items():
+            print(f"  {label}: {legacy:8.2f} ms -> {current:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure the cost of adding each element's extensions and client file URLs to
+`data` in `question_phases.prepare_data()`, with and without reusing them for
+elements with the same tag, for a question with many elements that have
+extensions.
+
+Run from `apps/prairielearn/python`:
+
+    python -m benchmarks.prepare_data_benchmark
+"""
+
+import timeit
+from typing import Any
+
+from prairielearn.internal import question_phases
+
+
+def make_context(num_extensions: int) -> question_phases.RenderContext:
+    extensions = {
+        f"extension-{i}": {
+            "name": f"extension-{i}",
+            "directory": f"/course/elementExtensions/pl-drawing/extension-{i}",
+            "controller": "extension.py",
+            "dependencies": {"extensionScripts": [f"extension-{i}.js"]},
+        }
+        for i in range(num_extensions)
+    }
+    return {
+        "html": "",
+        "elements": {
+            "pl-drawing": {
+                "name": "pl-drawing",
+                "controller": "pl-drawing.py",
+                "type": "core",
+            }
+        },
+        "element_extensions": {"pl-drawing": extensions},
+        "course_path": "/course",
+    }
+
+
+def run(
+    context: question_phases.RenderContext,
+    data: dict[str, Any],
+    num_elements: int,
+    *,
+    shared: bool,
+) -> None:
+    prepared: dict[str, question_phases.PreparedElementData] | None = (
+        {} if shared else None
+    )
+    for _ in range(num_elements):
+        question_phases.prepare_data("render", data, context, "pl-drawing", prepared)
+        question_phases.restore_data(data)
+
+
+def main() -> None:
+    data: dict[str, Any] = {
+        "options": {
+            "course_element_files_url": "/elements",
+            "course_element_extension_files_url": "/extensions",
+        }
+    }
+    for num_extensions in (1, 10):
+        context = make_context(num_extensions)
+        print(f"{num_extensions} extensions:")
+        for num_elements in (1, 10, 50):
+            for shared in (False, True):
+                number = 200
+                seconds = timeit.timeit(
+                    lambda: run(context, data, num_elements, shared=shared),  # noqa: B023
+                    number=number,
+                )
+                label = "shared" if shared else "per element"
+                print(
+                    f"  {num_elements:>3} elements {label:>11}: "
+                    f"{seconds / number * 1000:8.3f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Measure the cost of `question_phases.process()` for a question with large
+`params` and `correct_answers`, comparing the snapshot that `process()` takes
+for `check_data` with a complete `copy.deepcopy` of `data`, as it used to.
+
+Run from `apps/prairielearn/python`:
+
+    python -m benchmarks.question_phases_benchmark
+"""
+
+import copy
+import functools
+import random
+import timeit
+from typing import Any
+
+from prairielearn.internal import question_phases
+from prairielearn.internal.check_data import Phase
+
+CONTEXT: question_phases.RenderContext = {
+    "html": "<pl-question-panel><p>What is the answer?</p></pl-question-panel>",
+    "elements": {
+        "pl-question-panel": {
+            "name": "pl-question-panel",
+            "controller": "pl-question-panel.py",
+            "type": "core",
+        }
+    },
+    "element_extensions": {},
+    "course_path": "/course",
+}
+
+
+def make_data(size: int) -> dict[str, Any]:
+    rng = random.Random(0)
+    return {
+        "params": {
+            "matrix": [[rng.random() for _ in range(size)] for _ in range(size)],
+            "table": {f"row{i}": {"value": rng.random()} for i in range(size * 10)},
+        },
+        "correct_answers": {
+            "matrix": [[rng.random() for _ in range(size)] for _ in range(size)]
+        },
+        "submitted_answers": {"x": "1"},
+        "format_errors": {},
+        "raw_submitted_answers": {"x": "1"},
+        "partial_scores": {},
+        "score": 0,
+        "feedback": {},
+        "variant_seed": 1,
+        "options": {},
+        "gradable": True,
+    }
+
+
+def run(phase: Phase, data: dict[str, Any], *, deepcopy: bool) -> None:
+    original_data = copy.deepcopy(data) if deepcopy else None
+    question_phases.process(phase, data, CONTEXT, original_data=original_data)
+
+
+def main() -> None:
+    for size in (10, 100, 300):
+        data = make_data(size)
+        print(f"params with {size}x{size} matrices:")
+        for phase in ("render", "grade", "test"):
+            phase_data = dict(data)
+            if phase == "render":
+                del phase_data["gradable"]
+                phase_data.update({
+                    "editable": True,
+                    "manual_grading": False,
+                    "ai_grading": False,
+                    "panel": "question",
+                    "num_valid_submissions": 0,
+                    "options": {
+                        "course_element_files_url": "/elements",
+                        "course_element_extension_files_url": "/extensions",
+                    },
+                })
+            elif phase == "test":
+                phase_data["test_type"] = "correct"
+                del phase_data["submitted_answers"]
+            for deepcopy in (True, False):
+                number = 20
+                seconds = timeit.timeit(
+                    functools.partial(run, phase, phase_data, deepcopy=deepcopy),
+                    number=number,
+                )
+                label = "deepcopy" if deepcopy else "snapshot"
+                print(f"  {phase:>6} {label:>8}: {seconds / number * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
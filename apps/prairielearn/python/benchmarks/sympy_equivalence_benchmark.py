@@ -0,0 +1,54 @@
+"""
+Compare how long it takes to reject incorrect answers in `pl-symbolic-input`
+and `pl-big-o-input` with SymPy's symbolic `equals()` alone, and with
+`find_numeric_counterexample()` run first.
+
+Run from `apps/prairielearn/python`:
+
+    python -m benchmarks.sympy_equivalence_benchmark
+"""
+
+import time
+
+import prairielearn.sympy_utils as psu
+import sympy
+
+x, y = sympy.symbols("x y")
+
+# Pairs of correct and incorrect answers.
+CASES = [
+    (
+        sympy.sin(x) ** 6 + sympy.cos(x) ** 6,
+        1 - 3 * sympy.sin(x) ** 2 * sympy.cos(x) ** 2 + sympy.sin(x) / 1000,
+    ),
+    ((x + y) ** 12, sympy.expand((x + y) ** 12) + x),
+    (
+        sympy.exp(x) * sympy.sin(y) ** 3 / (1 + x**2),
+        sympy.exp(x) * (3 * sympy.sin(y) - sympy.sin(3 * y)) / (4 + 4 * x**2) + 1,
+    ),
+    (sympy.tan(x / 2), (1 - sympy.cos(x)) / sympy.sin(x) + x),
+    (sympy.atan(x) + sympy.atan(1 / x), sympy.pi / 2),
+    (x * sympy.log(x) + x**2, x * sympy.log(x**2) + x**2),
+]
+
+
+def is_equivalent(a: sympy.Expr, b: sympy.Expr) -> bool:
+    if psu.find_numeric_counterexample(a, b) is not None:
+        return False
+    return a.equals(b) is True
+
+
+def main() -> None:
+    print("time to reject an incorrect answer:")
+    for a, b in CASES:
+        start = time.perf_counter()
+        assert not a.equals(b)
+        legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        assert not is_equivalent(a, b)
+        current = time.perf_counter() - start
+        print(f"  {str(b)[:50]:50} {legacy * 1000:8.1f} ms -> {current * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare encoding and decoding a 20x20 symbolic matrix with `to_json` and
+`from_json`, printing and parsing every cell on its own, and printing and
+parsing the matrix in bulk, where cells that appear more than once are only
+handled once.
+
+Run from `apps/prairielearn/python`:
+
+    python -m benchmarks.sympy_matrix_benchmark
+"""
+
+import random
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+import prairielearn as pl
+import prairielearn.sympy_utils as psu
+import sympy
+
+x, y, t = sympy.symbols("x y t")
+
+
+def make_matrix(size: int) -> sympy.Matrix:
+    rng = random.Random(0)
+    cells = [0, 1, x, y, x * y, sympy.sin(t), x**2 - 2 * y, sympy.exp(-t) * x]
+    return sympy.Matrix(
+        size,
+        size,
+        lambda i, j: rng.choice(cells) if rng.random() < 0.7 else (i + 1) * x + j * y,
+    )
+
+
+def legacy_to_json(matrix: sympy.Matrix) -> dict[str, Any]:
+    num_rows, num_cols = matrix.shape
+    return {
+        "_type": "sympy_matrix",
+        "_value": [
+            [str(matrix[i, j]) for j in range(num_cols)] for i in range(num_rows)
+        ],
+        "_variables": [str(a) for a in matrix.free_symbols],
+        "_shape": [num_rows, num_cols],
+    }
+
+
+def legacy_from_json(value: dict[str, Any]) -> sympy.Matrix:
+    num_rows, num_cols = value["_shape"]
+    matrix = sympy.Matrix.zeros(num_rows, num_cols)
+    for i in range(num_rows):
+        for j in range(num_cols):
+            # Every cell was parsed from scratch.
+            psu.clear_parse_caches()
+            matrix[i, j] = psu.convert_string_to_sympy(
+                value["_value"][i][j], value["_variables"]
+            )
+    return matrix
+
+
+def from_json(value: dict[str, Any]) -> sympy.Matrix:
+    psu.clear_parse_caches()
+    return pl.from_json(value)
+
+
+def best_ms(fn: Callable[[], Any], number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000
+
+
+def main() -> None:
+    matrix = make_matrix(20)
+    value = pl.to_json(matrix)
+    assert value["_value"] == legacy_to_json(matrix)["_value"]
+    assert from_json(value) == legacy_from_json(value) == matrix
+
+    timings = {
+        "to_json": (
+            best_ms(lambda: legacy_to_json(matrix), number=10),
+            best_ms(lambda: pl.to_json(matrix), number=10),
+        ),
+        "from_json": (
+            best_ms(lambda: legacy_from_json(value), number=1),
+            best_ms(lambda: from_json(value), number=1),
+        ),
+    }
+    print("20x20 symbolic matrix:")
+    for label, (legacy, current) in timings.items():
+        print(f"  {label:>9}: {legacy:8.2f} ms -> {current:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
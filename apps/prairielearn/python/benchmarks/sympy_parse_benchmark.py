@@ -0,0 +1,77 @@
+"""
+Measure how many expressions `convert_string_to_sympy()` parses per second,
+with and without the setup that used to be repeated for every call: importing
+all of SymPy into a new global dict, creating the constants, and deep-copying
+the allowed names for the AST check. Parsing is measured with empty caches,
+and again for strings that have been parsed before, like a correct answer
+that is parsed in every phase.
+
+Run from `apps/prairielearn/python`:
+
+    python -m benchmarks.sympy_parse_benchmark
+"""
+
+import copy
+import timeit
+from typing import Any
+
+import prairielearn.sympy_utils as psu
+
+# Answers like the ones submitted to `pl-symbolic-input` and `pl-big-o-input`.
+EXPRESSIONS = [
+    ("x**2 + 2*x*y + y^2", ["x", "y"]),
+    ("sin(theta)^2 + cos(theta)^2", ["theta"]),
+    ("n log(n) + 3n", ["n"]),
+    ("exp(-t/tau) * (A + B t)", ["t", "tau", "A", "B"]),
+    ("sqrt(m g / k)", ["m", "g", "k"]),
+]
+
+
+def parse_all() -> None:
+    for expr, variables in EXPRESSIONS:
+        psu.convert_string_to_sympy(expr, variables)
+
+
+def parse_all_uncached() -> None:
+    psu.clear_parse_caches()
+    parse_all()
+
+
+def legacy_setup() -> None:
+    for _, variables in EXPRESSIONS:
+        global_dict: dict[str, Any] = {}
+        exec("from sympy import *", global_dict)
+        const = psu._Constants()
+        locals_for_eval = {
+            "functions": {**const.functions, **const.trig_functions},
+            "variables": {
+                **const.variables,
+                **{variable: psu.sympy.Symbol(variable) for variable in variables},
+            },
+            "helpers": const.helpers,
+        }
+        copy.deepcopy(locals_for_eval)
+
+
+def legacy_parse_all() -> None:
+    legacy_setup()
+    parse_all_uncached()
+
+
+def per_second(fn: Any, number: int = 50) -> float:
+    best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    return len(EXPRESSIONS) / best
+
+
+def main() -> None:
+    legacy = per_second(legacy_parse_all)
+    current = per_second(parse_all_uncached)
+    cached = per_second(parse_all, number=1000)
+    print("expressions parsed per second:")
+    print(f"  new strings:      {legacy:8.0f} -> {current:8.0f}")
+    print(f"  repeated strings: {legacy:8.0f} -> {cached:8.0f}")
+    print(psu.parse_cache_stats())
+
+
+if __name__ == "__main__":
+    main()
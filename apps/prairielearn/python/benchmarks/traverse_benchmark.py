@@ -0,0 +1,95 @@
+"""
+Measure the cost of traversing a long `question.html` that only contains a
+few elements:
+
+- For the phases other than `render`, compare a walk over every node in the
+  document with the selective traversal that `question_phases.process()` uses.
+- For `render`, compare elements that render a large table as a plain string,
+  which is parsed and traversed again, with ones that return `FinalHtml`.
+
+Run from `apps/prairielearn/python`:
+
+    python -m benchmarks.traverse_benchmark
+"""
+
+import functools
+import timeit
+from collections.abc import Callable
+
+import lxml.html
+from prairielearn.html_utils import FinalHtml
+from prairielearn.internal.traverse import (
+    ElementReplacement,
+    traverse_and_execute,
+    traverse_and_replace,
+)
+
+ELEMENT_TAGS = ["pl-question-panel", "pl-number-input", "pl-answer-panel"]
+
+
+def make_html(rows: int) -> str:
+    paragraphs = "".join(
+        f"<p>Row {i}: <b>bold</b> &amp; <i>italic</i> <code>x = {i}</code></p>\n"
+        for i in range(rows)
+    )
+    return (
+        f"<pl-question-panel>{paragraphs}</pl-question-panel>\n"
+        '<pl-number-input answers-name="x"></pl-number-input>\n'
+        "<pl-answer-panel><p>The answer.</p></pl-answer-panel>\n"
+    )
+
+
+def process_element(element: lxml.html.HtmlElement) -> None:
+    # `process_element` does the same check for every element it's given.
+    if element.tag not in ELEMENT_TAGS:
+        return
+
+
+def make_table(rows: int) -> str:
+    cells = "".join(
+        f"<tr><td>{i}</td><td>x &lt; {i}</td><td><code>{i}</code></td></tr>\n"
+        for i in range(rows)
+    )
+    return f'<table class="table">{cells}</table>'
+
+
+def render_element(element: lxml.html.HtmlElement, table: str) -> ElementReplacement:
+    if element.tag in ELEMENT_TAGS:
+        return table
+    return element
+
+
+def report(label: str, fn: Callable[[], object]) -> None:
+    number = 100
+    seconds = timeit.timeit(fn, number=number)
+    print(f"  {label:>13}: {seconds / number * 1000:8.3f} ms")
+
+
+def main() -> None:
+    for rows in (10, 100, 1000):
+        html = make_html(rows)
+        table = make_table(rows)
+        print(f"{rows} paragraphs and table rows ({len(html)} characters):")
+        for label, tags in (("all nodes", None), ("selective", ELEMENT_TAGS)):
+            report(
+                label,
+                functools.partial(
+                    traverse_and_execute, html, process_element, tags=tags
+                ),
+            )
+        for label, rendered in (
+            ("render string", table),
+            ("render final", FinalHtml(table)),
+        ):
+            report(
+                label,
+                functools.partial(
+                    traverse_and_replace,
+                    html,
+                    functools.partial(render_element, table=rendered),
+                ),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare the cost of parsing a quantity the way `pl-units-input` used to,
+creating a unit registry for every call, with parsing it using the shared
+registry and the cache of parsed quantities.
+
+Run from `apps/prairielearn/python`:
+
+    python -m benchmarks.units_benchmark
+"""
+
+import os
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+import prairielearn as pl
+from pint import UnitRegistry
+
+QUANTITIES = ["9.8 m/s^2", "1.5 kg", "300 K", "12 N*m"]
+
+
+def legacy_parse(quantity: str) -> Any:
+    ureg = UnitRegistry(cache_folder=f"/tmp/pint_{os.getpid()}")
+    return ureg.Quantity(quantity)
+
+
+def uncached_parse(quantity: str) -> Any:
+    return pl.get_unit_registry().Quantity(quantity)
+
+
+def best_ms(fn: Callable[[], Any], number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000
+
+
+def main() -> None:
+    for quantity in QUANTITIES:
+        assert pl.parse_quantity(quantity) == legacy_parse(quantity)
+    timings = {
+        "new registry": best_ms(
+            lambda: [legacy_parse(q) for q in QUANTITIES], number=2
+        ),
+        "shared registry": best_ms(
+            lambda: [uncached_parse(q) for q in QUANTITIES], number=100
+        ),
+        "parse_quantity": best_ms(
+            lambda: [pl.parse_quantity(q) for q in QUANTITIES], number=1000
+        ),
+    }
+    print(f"parsing {len(QUANTITIES)} quantities:")
+    for label, ms in timings.items():
+        print(f"  {label:>15}: {ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,12 +16,13 @@ import numpy as np
 import numpy.typing as npt
 import pandas as pd
 import sympy
+from sympy.printing.str import StrPrinter
 from typing_extensions import assert_never
 
 from prairielearn.html_utils import escape_invalid_string
 from prairielearn.misc_utils import full_unidecode
 from prairielearn.sympy_utils import (
-    convert_string_to_sympy,
+    convert_strings_to_sympy,
     is_sympy_json,
     json_to_sympy,
     sympy_to_json,
@@ -198,9 +199,17 @@ def to_json(
     elif isinstance(v, (sympy.Matrix, sympy.ImmutableMatrix)):
         s = [str(a) for a in v.free_symbols]
         num_rows, num_cols = v.shape
+        # Matches `str()`, but cells that appear more than once are only
+        # printed once.
+        printer = StrPrinter({"order": None})
+        printed: dict[sympy.Basic, str] = {}
         matrix = []
-        for i in range(num_rows):
-            row = [str(v[i, j]) for j in range(num_cols)]
+        for row_cells in v.tolist():
+            row = []
+            for cell in row_cells:
+                if cell not in printed:
+                    printed[cell] = printer.doprint(cell)
+                row.append(printed[cell])
             matrix.append(row)
         return {
             "_type": "sympy_matrix",
@@ -346,11 +355,11 @@ def from_json(v: _JSONSerializedType | Any) -> Any:
                 value = v_json["_value"]
                 variables = v_json["_variables"]
                 shape = v_json["_shape"]
-                matrix = sympy.Matrix.zeros(shape[0], shape[1])
-                for i in range(shape[0]):
-                    for j in range(shape[1]):
-                        matrix[i, j] = convert_string_to_sympy(value[i][j], variables)
-                return matrix
+                cells = convert_strings_to_sympy(
+                    [value[i][j] for i in range(shape[0]) for j in range(shape[1])],
+                    variables,
+                )
+                return sympy.Matrix(shape[0], shape[1], cells)
             else:
                 raise ValueError(
                     "variable of type sympy_matrix should have value, variables, and shape"
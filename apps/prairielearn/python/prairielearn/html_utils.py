@@ -35,6 +35,25 @@ LIBXML_BOOLEAN_ATTRIBUTES = frozenset({
 })
 
 
+# Elements must return a `str` from `render()`, so this can't be a `UserString`.
+class FinalHtml(str):  # noqa: FURB189
+    """HTML returned from an element's `render()` function that is already final.
+
+    Normally, the HTML that an element renders is parsed again, both to render
+    any elements nested inside it and to normalize it. HTML wrapped in this
+    class is instead included in the page exactly as it is, which is faster for
+    elements that render large amounts of HTML. It must therefore be
+    well-formed, with all text and attribute values escaped, and must not
+    contain any other elements that need to be rendered.
+
+    Examples:
+        >>> def render(element_html, data):
+        ...     return FinalHtml(f"<p>{html.escape(data['params']['text'])}</p>")
+    """
+
+    __slots__ = ()
+
+
 def get_enum_attrib(
     element: lxml.html.HtmlElement,
     name: str,
@@ -0,0 +1,115 @@
+"""
+A long-lived Node process that runs legacy v2 questions for a worker.
+
+Node can't fork like the zygote does, so each worker keeps its own Node
+process for v2 calls instead of starting one per call. Requests and responses
+are JSON documents, one per line, on the Node process's stdin and stdout.
+Anything the question code logs goes to stderr, which is collected in a
+temporary file and printed to the worker's stderr after each call. Output from
+starting the process, like the reason it failed to start, is printed with the
+first call, even if the process was started before that call came in. The Node
+process exits once its stdin is closed, which
+happens at the latest when the worker exits on `restart`, so every worker gets
+a fresh one.
+"""
+
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any
+
+# Relative to the root of the PrairieLearn repository, which is the working
+# directory of v2 calls.
+COMMAND = ("node", "./apps/prairielearn/dist/question-servers/calculation-worker.js")
+
+
+class CalculationWorker:
+    def __init__(
+        self,
+        cwd: str | os.PathLike[str],
+        command: tuple[str, ...] = COMMAND,
+    ) -> None:
+        self.cwd = os.path.realpath(cwd)
+        # The file is opened again for reading, so that reading it doesn't
+        # share a file offset with the process writing to it.
+        fd, path = tempfile.mkstemp(prefix="calculation-worker-")
+        try:
+            self.stderr = open(path, encoding="utf-8")  # noqa: SIM115
+        finally:
+            os.unlink(path)
+        try:
+            with os.fdopen(fd, "w") as stderr:
+                self.process = subprocess.Popen(
+                    command,
+                    cwd=self.cwd,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr,
+                    encoding="utf-8",
+                )
+        except BaseException:
+            self.stderr.close()
+            raise
+
+    def is_usable(self, cwd: str) -> bool:
+        """
+        Check whether this process can handle a call made from `cwd`.
+
+        Returns:
+            Whether the process is still running in the same directory.
+        """
+        return self.cwd == os.path.realpath(cwd) and self.process.poll() is None
+
+    def call(self, request: Any) -> str:
+        """
+        Send a request and wait for the response.
+
+        Returns:
+            The response, as a JSON string.
+
+        Raises:
+            subprocess.CalledProcessError: If the process exited before
+                responding. Its output, including the reason, is printed to
+                stderr first.
+        """
+        assert self.process.stdin is not None
+        assert self.process.stdout is not None
+
+        response = ""
+        with contextlib.suppress(BrokenPipeError):
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+            response = self.process.stdout.readline()
+        if not response:
+            self.close()
+            raise subprocess.CalledProcessError(
+                self.process.returncode, self.process.args
+            )
+        self.print_stderr()
+        return response.removesuffix("\n")
+
+    def print_stderr(self) -> None:
+        """Print anything the process has written to stderr since the last call."""
+        output = self.stderr.read()
+        if output:
+            print(output, file=sys.stderr)
+            sys.stderr.flush()
+
+    def close(self) -> None:
+        """Close the process's stdin and wait for it to exit."""
+        with contextlib.suppress(BrokenPipeError):
+            if self.process.stdin is not None:
+                self.process.stdin.close()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        if self.process.stdout is not None:
+            self.process.stdout.close()
+        if not self.stderr.closed:
+            self.print_stderr()
+            self.stderr.close()
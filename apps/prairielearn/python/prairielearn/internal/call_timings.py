@@ -0,0 +1,113 @@
+"""
+Opt-in instrumentation of where time goes during a single worker call, and
+of how much memory a worker shares with the zygote.
+
+Each measured section is timed exclusively of any sections nested inside it,
+so the reported times add up to (roughly) the total time of the call.
+"""
+
+import contextlib
+import time
+from types import TracebackType
+from typing import Any
+
+import psutil
+
+
+def current_rss() -> int:
+    return psutil.Process().memory_info().rss
+
+
+def memory_usage() -> dict[str, int]:
+    """
+    Report how much of this process's memory is shared with other processes
+    (for a worker, mostly pages inherited from the zygote) and how much is
+    private to it. This reads the process's page mappings, so it takes a few
+    milliseconds.
+
+    Returns:
+        The resident, proportional, private, and shared memory, in bytes.
+    """
+    info = psutil.Process().memory_full_info()
+    return {
+        "rss_bytes": info.rss,
+        "pss_bytes": getattr(info, "pss", info.uss),
+        "private_bytes": info.uss,
+        "shared_bytes": info.rss - info.uss,
+    }
+
+
+class CallTimings:
+    def __init__(self, start: float | None = None) -> None:
+        self.start = time.perf_counter() if start is None else start
+        self.start_rss = current_rss()
+        self.sections_ms: dict[str, float] = {}
+        self.elements_ms: dict[str, float] = {}
+        # Time spent in sections nested inside each currently open section.
+        self._nested: list[float] = []
+
+    def add(self, key: str, ms: float, *, element: bool = False) -> None:
+        target = self.elements_ms if element else self.sections_ms
+        target[key] = target.get(key, 0) + ms
+
+    def measure(self, key: str, *, element: bool = False) -> "Measurement":
+        """
+        Time the enclosed block and add it to `key`. If `element` is set, `key`
+        is an element tag and the time is reported under `elements_ms`.
+
+        Returns:
+            A context manager that times the enclosed block.
+        """
+        return Measurement(self, key, element=element)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "total_ms": (time.perf_counter() - self.start) * 1000,
+            "sections_ms": self.sections_ms,
+            "elements_ms": self.elements_ms,
+            "rss_delta_bytes": current_rss() - self.start_rss,
+        }
+
+
+class Measurement:
+    """A section of a call being timed by `CallTimings.measure`."""
+
+    def __init__(self, timings: CallTimings, key: str, *, element: bool) -> None:
+        self.timings = timings
+        self.key = key
+        self.element = element
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        """Starts timing the section."""
+        self.start = time.perf_counter()
+        self.timings._nested.append(0)
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Adds the time spent in the section, minus nested sections, to its key."""
+        nested = self.timings._nested
+        elapsed = time.perf_counter() - self.start
+        self.timings.add(
+            self.key, (elapsed - nested.pop()) * 1000, element=self.element
+        )
+        if nested:
+            nested[-1] += elapsed
+
+
+def measure(
+    timings: CallTimings | None, key: str, *, element: bool = False
+) -> contextlib.AbstractContextManager[None]:
+    """
+    Like `CallTimings.measure`, but does nothing if `timings` is `None`.
+
+    Returns:
+        A context manager that times the enclosed block.
+    """
+    if timings is None:
+        return contextlib.nullcontext()
+    return timings.measure(key, element=element)
@@ -1,3 +1,5 @@
+import copy
+import operator
 from typing import Any, Literal, TypedDict
 
 Phase = Literal["generate", "prepare", "render", "parse", "grade", "test", "file"]
@@ -133,6 +135,8 @@ def check_prop(
     present_phases: frozenset[Phase],
     edit_phases: frozenset[Phase],
     phase: Phase,
+    *,
+    compare_values: bool = True,
 ) -> None:
     # Short-circuit if we don't care about this prop in this phase.
     if phase not in present_phases:
@@ -155,13 +159,26 @@ def check_prop(
         raise ValueError(f'Expected data["{prop}"] to be an object')
 
     # Check the value.
-    if phase not in edit_phases and old_value != new_value:
+    if compare_values and phase not in edit_phases and old_value != new_value:
         raise ValueError(f'data["{prop}"] has been illegally modified')
 
 
 def check_data(
-    old_data: dict[Any, Any], new_data: dict[Any, Any], phase: Phase
+    old_data: dict[Any, Any],
+    new_data: dict[Any, Any],
+    phase: Phase,
+    *,
+    compare_values: bool = True,
 ) -> None:
+    """
+    Check that `new_data` only has the expected props, with the expected types,
+    and that the props that can't be edited in `phase` still have their values
+    from `old_data`. With `compare_values=False`, the values aren't compared,
+    which can be done later for several changes to `data` at once.
+
+    Raises:
+        ValueError: If `new_data` is invalid.
+    """
     # First, check for extra keys on `new_data`.
     extra_keys = set(new_data.keys()) - set(PROPS.keys())
     if extra_keys:
@@ -186,4 +203,92 @@ def check_data(
             prop_info["present_phases"],
             prop_info["edit_phases"],
             phase,
+            compare_values=compare_values,
         )
+
+
+def fingerprint_data(data: dict[Any, Any], phase: Phase) -> list[Any]:
+    """
+    Compute a cheap fingerprint of the props that can't be edited in `phase`:
+    the props themselves and their direct children (and keys). Unlike a
+    comparison, this doesn't visit the whole value, so it can be computed
+    before and after every element to find out whether the element needs to be
+    checked right away. Changes nested more deeply aren't reflected.
+
+    Returns:
+        The fingerprint, to be compared with `same_fingerprint`.
+    """
+    fingerprint: list[Any] = []
+    for key, value in data.items():
+        prop_info = PROPS.get(key)
+        if prop_info is not None and phase in prop_info["edit_phases"]:
+            continue
+        fingerprint.extend((key, value))
+        if isinstance(value, dict):
+            fingerprint.extend(value)
+            fingerprint.extend(value.values())
+        elif isinstance(value, list):
+            fingerprint.extend(value)
+    return fingerprint
+
+
+def count_compared_values(data: dict[Any, Any], phase: Phase, limit: int) -> int:
+    """
+    Count the values, including nested ones, of the props that can't be edited
+    in `phase`, which `check_data` has to visit to compare them. Counting stops
+    once more than `limit` values have been found.
+
+    Returns:
+        The number of values, or a number greater than `limit`.
+    """
+    values = [
+        value
+        for key, value in data.items()
+        if key not in PROPS or phase not in PROPS[key]["edit_phases"]
+    ]
+    count = len(values)
+    stack = [value for value in values if isinstance(value, (dict, list))]
+    while stack and count <= limit:
+        value = stack.pop()
+        children = value.values() if isinstance(value, dict) else value
+        count += len(children)
+        stack.extend(child for child in children if isinstance(child, (dict, list)))
+    return count
+
+
+def same_fingerprint(a: list[Any], b: list[Any]) -> bool:
+    """
+    Compare fingerprints from `fingerprint_data` by identity. The fingerprints
+    hold references to the objects they describe, so an object that has been
+    replaced can't be mistaken for a new one that reuses its memory.
+
+    Returns:
+        Whether the fingerprints are the same.
+    """
+    return len(a) == len(b) and all(map(operator.is_, a, b))
+
+
+def snapshot_data(data: dict[Any, Any], phase: Phase) -> dict[Any, Any]:
+    """
+    Copy `data` so that `check_data` can later detect illegal modifications
+    made during `phase`.
+
+    `check_data` only compares the values of props that are present in a phase
+    but can't be edited in it. Only those are deep-copied; the others (like
+    `params` during `generate` and `grade`) are shared with `data`, which
+    avoids copying what are often the largest parts of `data`.
+
+    Returns:
+        A dict with the same keys as `data`.
+    """
+    snapshot = {}
+    for key, value in data.items():
+        prop_info = PROPS.get(key)
+        if prop_info is not None and (
+            phase not in prop_info["present_phases"]
+            or phase in prop_info["edit_phases"]
+        ):
+            snapshot[key] = value
+        else:
+            snapshot[key] = copy.deepcopy(value)
+    return snapshot
@@ -0,0 +1,127 @@
+"""
+Caching of compiled code objects for question `server.py` files and element
+controllers.
+
+Compiled code is kept in memory, keyed by path and validated against the
+file's mtime and size. The zygote pre-compiles the core element controllers
+before it forks, so every worker inherits them copy-on-write. Optionally,
+code objects can also be marshalled to a directory on disk, keyed by a hash of
+the path and source, so that they survive worker and zygote restarts.
+"""
+
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import pathlib
+import tempfile
+from types import CodeType
+
+_memory_cache: dict[str, tuple[int, int, CodeType]] = {}
+_disk_cache_dir: pathlib.Path | None = None
+
+
+def set_disk_cache_dir(path: str | os.PathLike[str] | None) -> None:
+    """
+    Enable or disable (with `None`) the on-disk cache of marshalled code.
+
+    The directory is created if it does not exist. Only enable this when every
+    process that can write to the directory is trusted to run the cached code.
+    """
+    global _disk_cache_dir  # noqa: PLW0603
+    if path is None:
+        _disk_cache_dir = None
+        return
+    _disk_cache_dir = pathlib.Path(path)
+    _disk_cache_dir.mkdir(parents=True, exist_ok=True)
+
+
+def _disk_cache_path(filename: str, source: bytes) -> pathlib.Path | None:
+    if _disk_cache_dir is None:
+        return None
+    key = hashlib.sha256(importlib.util.MAGIC_NUMBER)
+    key.update(os.fsencode(filename) + b"\0")
+    key.update(source)
+    return _disk_cache_dir / f"{key.hexdigest()}.marshal"
+
+
+def _load_from_disk(cache_path: pathlib.Path) -> CodeType | None:
+    try:
+        code = marshal.loads(cache_path.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return code if isinstance(code, CodeType) else None
+
+
+def _write_to_disk(cache_path: pathlib.Path, code: CodeType) -> None:
+    # Write to a temporary file and rename it into place so that concurrent
+    # readers never see a partially-written file.
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(marshal.dumps(code))
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        # The cache is only an optimization.
+        pass
+
+
+def compile_file(path: str | os.PathLike[str]) -> CodeType:
+    """
+    Compile the Python file at `path`, reusing a cached code object if the
+    file has not changed.
+
+    The filename is associated with the code object, so the filename appears
+    in the traceback if there is an error: https://stackoverflow.com/a/437857
+
+    Returns:
+        The compiled code object.
+    """
+    filename = os.fspath(path)
+    st = os.stat(filename)
+    cached = _memory_cache.get(filename)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+
+    with open(filename, "rb") as f:
+        source = f.read()
+
+    cache_path = _disk_cache_path(filename, source)
+    code = _load_from_disk(cache_path) if cache_path is not None else None
+    if code is None:
+        # Decode the source ourselves to match the previous behavior of
+        # reading the file as UTF-8 text, regardless of any coding cookie.
+        code = compile(source.decode("utf-8"), filename, "exec")
+        if cache_path is not None:
+            _write_to_disk(cache_path, code)
+
+    _memory_cache[filename] = (st.st_mtime_ns, st.st_size, code)
+    return code
+
+
+def precompile_elements(elements_path: pathlib.Path) -> int:
+    """
+    Compile the controller of every element in `elements_path`, as named by
+    the `controller` in each element's `info.json`.
+
+    Returns:
+        The number of controllers that were compiled.
+    """
+    count = 0
+    for info_path in sorted(elements_path.glob("*/info.json")):
+        try:
+            with open(info_path, encoding="utf-8") as f:
+                controller = json.load(f).get("controller")
+            if controller is None:
+                continue
+            compile_file(info_path.parent / controller)
+        except (OSError, ValueError, SyntaxError):
+            # The worker will report the error if the element is ever used.
+            continue
+        count += 1
+    return count
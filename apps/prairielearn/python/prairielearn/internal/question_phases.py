@@ -1,28 +1,72 @@
 import base64
+import contextlib
 import copy
 import io
+import json
 import os
 import pathlib
+import random
 import sys
+from collections.abc import Callable
 from inspect import signature
-from typing import Any, Literal, TypedDict
+from types import CodeType
+from typing import Any, Literal, NamedTuple, NoReturn, TypedDict
 
 import lxml.html
-from typing_extensions import assert_never
-
-from prairielearn.internal.check_data import Phase, check_data
-from prairielearn.internal.traverse import traverse_and_execute, traverse_and_replace
+import numpy as np
+from typing_extensions import NotRequired, Self, assert_never, override
+
+from prairielearn.html_utils import FinalHtml
+from prairielearn.internal.call_timings import CallTimings, measure
+from prairielearn.internal.check_data import (
+    Phase,
+    check_data,
+    count_compared_values,
+    fingerprint_data,
+    same_fingerprint,
+    snapshot_data,
+)
+from prairielearn.internal.code_cache import compile_file
+from prairielearn.internal.traverse import (
+    Fragments,
+    copy_fragments,
+    parse_fragments,
+    traverse_and_execute,
+    traverse_and_replace,
+)
 from prairielearn.internal.zygote_utils import get_module_function
 
 PYTHON_PATH = pathlib.Path(__file__).parent.parent.parent.resolve()
 CORE_ELEMENTS_PATH = (PYTHON_PATH.parent / "elements").resolve()
 SAVED_PATH = copy.copy(sys.path)
 
+# We'll cache instantiated modules for the lifetime of the worker for two reasons:
+# - This allows us to avoid re-reading/compiling/executing them if the same
+#   element is used multiple times, including across calls to `process()`.
+# - This allows element code to maintain state across multiple calls. This is useful
+#   specifically for elements that want to maintain a cache of expensive-to-compute data.
+mod_cache: dict[pathlib.Path, dict[str, Any]] = {}
+
+# The code objects that modules in `mod_cache` were created from by
+# `preload_core_elements()`, so that we can detect controllers that changed
+# after they were preloaded.
+preloaded_code: dict[pathlib.Path, CodeType] = {}
+
+# Up to this many values in the props that can't be edited in a phase, `process`
+# compares them after every element. Beyond that, comparisons are deferred.
+COMPARE_EACH_ELEMENT_LIMIT = 1000
+
+
+class _DeferredCheckError(Exception):
+    """A deferred comparison found an illegal change by an unknown element."""
+
 
 class ElementInfo(TypedDict):
     name: str
     controller: str
     type: Literal["core", "course"]
+    renderPure: NotRequired[bool]
+    """Whether `render()` only reads `data`, so it can run in another process."""
 
 
 class RenderContext(TypedDict):
@@ -58,9 +102,120 @@ def filelike_to_string(filelike: Any) -> str:
     return base64.b64encode(filelike).decode()
 
 
+def find_core_element_controllers() -> dict[str, pathlib.Path]:
+    """
+    Find the controller of every core element, as named by the `controller`
+    in each element's `info.json`.
+
+    Returns:
+        A dict mapping each element's name to the path of its controller.
+    """
+    controllers: dict[str, pathlib.Path] = {}
+    for info_path in sorted(CORE_ELEMENTS_PATH.glob("*/info.json")):
+        with open(info_path, encoding="utf-8") as f:
+            element_controller = json.load(f).get("controller")
+        if element_controller is not None:
+            controllers[info_path.parent.name] = info_path.parent / element_controller
+    return controllers
+
+
+def load_core_element_controller(
+    element_controller_path: pathlib.Path,
+) -> tuple[dict[str, Any], CodeType]:
+    """
+    Execute a core element controller the same way `process` does, but
+    without adding it to `mod_cache`.
+
+    Returns:
+        The module namespace and the code object it was created from.
+    """
+    saved_cwd = os.getcwd()
+    try:
+        element_path = element_controller_path.parent
+        os.chdir(element_path)
+        sys.path = copy.copy(SAVED_PATH)
+        sys.path.insert(0, str(PYTHON_PATH))
+        sys.path.insert(0, str(element_path))
+
+        code = compile_file(element_controller_path)
+        mod: dict[str, Any] = {}
+        exec(code, mod)
+        return mod, code
+    finally:
+        os.chdir(saved_cwd)
+        sys.path = copy.copy(SAVED_PATH)
+
+
+def preload_core_elements(controllers: dict[str, pathlib.Path]) -> list[str]:
+    """
+    Execute the given core element controllers and add their modules to
+    `mod_cache`, so that processes forked afterwards don't have to load them
+    again.
+
+    Modules imported from the element directories themselves (such as
+    `dag_checker` for `pl-order-blocks`) are removed from `sys.modules`
+    afterwards. The controllers keep their references to them, but they
+    would otherwise shadow question modules with the same name.
+
+    Returns:
+        The names of the elements that were preloaded.
+    """
+    saved_modules = set(sys.modules)
+    preloaded: list[str] = []
+    try:
+        for element_name, element_controller_path in controllers.items():
+            try:
+                mod, code = load_core_element_controller(element_controller_path)
+            except Exception:
+                # Workers will load the element themselves and report the
+                # error if it is ever used.
+                continue
+            mod_cache[element_controller_path] = mod
+            preloaded_code[element_controller_path] = code
+            preloaded.append(element_name)
+    finally:
+        for name in set(sys.modules) - saved_modules:
+            module_file = getattr(sys.modules[name], "__file__", None)
+            if module_file is not None and pathlib.Path(module_file).is_relative_to(
+                CORE_ELEMENTS_PATH
+            ):
+                del sys.modules[name]
+    return preloaded
+
+
 def process(
-    phase: Phase, data: dict[str, Any], context: RenderContext
+    phase: Phase,
+    data: dict[str, Any],
+    context: RenderContext,
+    *,
+    original_data: dict[str, Any] | None = None,
+    timings: CallTimings | None = None,
+    render_processes: int = 0,
+    compare_each_element: bool = False,
 ) -> tuple[str | None, set[str]]:
+    """
+    Run the given phase for every element in the question's HTML.
+
+    If `render_processes` is greater than one, elements whose `info.json`
+    declares them `renderPure` are rendered in up to that many forked child
+    processes before the rest of the document is rendered.
+
+    If `compare_each_element` is set, `data` is compared with `original_data`
+    after every element, no matter how large it is.
+
+    When a comparison that was deferred for large data fails, the elements are
+    run a second time to find the one that made the change. The second run
+    works on a copy of the data and its output is discarded, but any other
+    side effects of the elements (like state kept in their modules) happen
+    again, so elements should behave the same when run twice on the same data.
+
+    Returns:
+        The rendered HTML or file data (`None` in other phases), and the names
+        of the elements that were processed.
+
+    Raises:
+        RuntimeError: If an element fails or makes invalid changes to `data`.
+    """
     html = context["html"]
     elements = context["elements"]
     course_path = context["course_path"]
@@ -68,24 +223,61 @@ def process(
     # This will track which elements have been processed.
     processed_elements: set[str] = set()
 
+    # The data that `prepare_data` adds for each element tag, which is the
+    # same for every element with that tag.
+    prepared: dict[str, PreparedElementData] = {}
+
+    # Elements that ran since the values in `data` were last compared with
+    # `original_data`.
+    unchecked_elements: list[str] = []
+
     # If we're in the `render` phase, we'll eventually capture the HTML here.
     # If we're in the `file` phase, we'll capture file data here.
     # Otherwise, this will remain `None`.
     result = None
 
+    # For legacy reasons, we don't validate `data` during the `render` or
+    # `file` phases, since the old question processor didn't either. These
+    # phases will never produce new data that's stored anywhere, so this
+    # should technically be fine, though the lack of an error could mislead
+    # instructors into thinking that any changed data will be persisted.
+    #
+    # TODO: Once we have a system for reporting warnings to instructors,
+    # we should restore this check and emit a warning if it fails.
+    # See https://github.com/PrairieLearn/PrairieLearn/issues/7337
+    validate_data = phase not in ("render", "file")
+
     # Copying data is potentially expensive, and most of it won't change as we
-    # process all the elements, so we'll make a deep copy of the data once and
-    # use that for future comparisons. For the few pieces of data that do
-    # change based on the element, we'll add and then delete them from
-    # `original_data` as needed.
-    original_data = copy.deepcopy(data)
-
-    # We'll cache instantiated modules for two reasons:
-    # - This allows us to avoid re-reading/compiling/executing them if the same
-    #   element is used multiple times.
-    # - This allows element code to maintain state across multiple calls. This is useful
-    #   specifically for elements that want to maintain a cache of expensive-to-compute data.
-    mod_cache: dict[pathlib.Path, dict[str, Any]] = {}
+    # process all the elements, so we'll snapshot the data once and use that
+    # for future comparisons. Only the props that `check_data` compares in this
+    # phase are actually copied. For the few pieces of data that do change
+    # based on the element, we'll add and then delete them from
+    # `original_data` as needed. Callers that need a complete copy themselves
+    # can provide it.
+    #
+    # Comparing the values of props that can't be edited means visiting all of
+    # them. If they're large, they're only compared right away when an element
+    # evidently changed one of them, according to a cheap fingerprint, and
+    # otherwise once all elements are done. If such a deferred comparison
+    # fails, the elements are run again from `original_data`, this time
+    # comparing after every element, to find the one that made the change. For
+    # that, `original_data` has to be a complete copy.
+    defer_compare = (
+        validate_data
+        and not compare_each_element
+        and count_compared_values(data, phase, COMPARE_EACH_ELEMENT_LIMIT)
+        > COMPARE_EACH_ELEMENT_LIMIT
+    )
+    if original_data is None and validate_data:
+        with measure(timings, "snapshot"):
+            if defer_compare:
+                original_data = copy.deepcopy(data)
+            else:
+                original_data = snapshot_data(data, phase)
+    # The replay starts from the same random state as the elements did.
+    random_states = (
+        (random.getstate(), np.random.get_state()) if defer_compare else None
+    )
 
     def process_element(
         element: lxml.html.HtmlElement,
@@ -124,16 +316,17 @@ def process(
             sys.path.insert(0, str(element_path))
 
             mod = mod_cache.get(element_controller_path)
+            preloaded = preloaded_code.pop(element_controller_path, None)
+            if (
+                preloaded is not None
+                and compile_file(element_controller_path) is not preloaded
+            ):
+                # The controller has changed since it was preloaded.
+                mod = None
             if mod is None:
-                mod = {}
-
-                with open(element_controller_path, encoding="utf-8") as inf:
-                    # Use `compile` to associate filename with code object, so the
-                    # filename appears in the traceback if there is an error:
-                    # https://stackoverflow.com/a/437857
-                    code = compile(inf.read(), element_controller_path, "exec")
-
-                exec(code, mod)
+                with measure(timings, "module_load"):
+                    mod = {}
+                    exec(compile_file(element_controller_path), mod)
                 mod_cache[element_controller_path] = mod
 
             method = get_module_function(mod, phase)
@@ -141,15 +334,14 @@ def process(
                 return None
 
             # Add element-specific or phase-specific information to the data.
-            prepare_data(phase, data, context, element.tag)
-            prepare_data(phase, original_data, context, element.tag)
-
-            # Temporarily strip tail text from the element; the `parse_fragment`
-            # function will choke on it.
-            temp_tail = element.tail
-            element.tail = None
+            prepare_data(phase, data, context, element.tag, prepared)
+            if original_data is not None:
+                prepare_data(phase, original_data, context, element.tag, prepared)
 
-            args: list[Any] = [lxml.html.tostring(element), data]
+            # Leave out the element's tail text; the `parse_fragment` function
+            # will choke on it. The element itself must not be modified, since
+            # the parsed HTML may be shared with other calls.
+            args: list[Any] = [lxml.html.tostring(element, with_tail=False), data]
 
             # We need to support legacy element functions, which take three arguments.
             # The second argument is `element_index`; we'll pass `None`. This is
@@ -158,26 +350,36 @@ def process(
             if arg_names == ["element_html", "element_index", "data"]:
                 args.insert(1, None)
 
-            element_value = method(*args)
-            # Restore the tail text.
-            element.tail = temp_tail
-
-            if phase not in ("render", "file"):
-                # For legacy reasons, we don't validate `data` during the,
-                # `render` or `file` phases, since the old question processor
-                # didn't either. These phases will never produce new data
-                # that's stored anywhere, so this should technically be fine,
-                # though the lack of an error could mislead instructors into
-                # thinking that any changed data will be persisted.
-                #
-                # TODO: Once we have a system for reporting warnings to instructors,
-                # we should restore this check and emit a warning if it fails.
-                # See https://github.com/PrairieLearn/PrairieLearn/issues/7337
-                check_data(original_data, data, phase)
+            fingerprint: list[Any] = []
+            if defer_compare:
+                with measure(timings, "check_data"):
+                    fingerprint = fingerprint_data(data, phase)
+            with measure(timings, element.tag, element=True):
+                element_value = method(*args)
+
+            if validate_data:
+                assert original_data is not None
+                with measure(timings, "check_data"):
+                    if not defer_compare:
+                        check_data(original_data, data, phase)
+                    elif same_fingerprint(fingerprint, fingerprint_data(data, phase)):
+                        check_data(original_data, data, phase, compare_values=False)
+                        unchecked_elements.append(element.tag)
+                    elif not unchecked_elements:
+                        check_data(original_data, data, phase)
+                    else:
+                        # The change may have been made by an earlier element.
+                        unchecked_elements.append(element.tag)
+                        try:
+                            check_data(original_data, data, phase)
+                        except ValueError as exc:
+                            raise _DeferredCheckError from exc
+                        unchecked_elements.clear()
 
             # Clean up changes to `data` and `original_data` for the next iteration.
             restore_data(data)
-            restore_data(original_data)
+            if original_data is not None:
+                restore_data(original_data)
 
             if phase == "render":
                 # TODO: validate that return value was a string?
@@ -195,16 +397,79 @@ def process(
                     + "For now, the return value will be used instead of the data object that was passed in.\n\n"
                     + "In the future, returning a different object will trigger a fatal error."
                 )
+        except _DeferredCheckError:
+            raise
         except Exception as exc:
             raise RuntimeError(f"Error processing element {element.tag}") from exc
 
     def process_element_return_none(element: lxml.html.HtmlElement) -> None:
         process_element(element)
 
-    if phase == "render":
-        result = traverse_and_replace(html, process_element)
-    else:
-        traverse_and_execute(html, process_element_return_none)
+    # The error from a failed deferred comparison.
+    deferred_error: BaseException | None = None
+
+    # Time spent in the traversal itself (parsing and serializing the HTML,
+    # preparing `data` for each element) is reported as `traverse`.
+    with measure(timings, "traverse"):
+        if phase == "render":
+            fragments = copy_fragments(parse_fragments(html))
+            rendered: dict[lxml.html.HtmlElement, Any] = {}
+            if render_processes > 1:
+                pure_elements = find_render_pure_elements(fragments, elements)
+                if len(pure_elements) > 1:
+                    rendered = render_in_subprocesses(
+                        pure_elements, process_element, render_processes
+                    )
+
+            def render_element(element: lxml.html.HtmlElement) -> Any:
+                if element in rendered:
+                    processed_elements.add(element.tag)
+                    return rendered[element]
+                return process_element(element)
+
+            result = traverse_and_replace(fragments, render_element)
+        else:
+            # Only elements can do anything in these phases, so the rest of
+            # the document doesn't need to be visited.
+            try:
+                traverse_and_execute(html, process_element_return_none, tags=elements)
+            except _DeferredCheckError as exc:
+                deferred_error = exc.__cause__
+
+    if unchecked_elements and deferred_error is None:
+        assert original_data is not None
+        with measure(timings, "check_data"):
+            try:
+                check_data(original_data, data, phase)
+            except ValueError as exc:
+                deferred_error = exc
+
+    if deferred_error is not None:
+        assert original_data is not None
+        assert random_states is not None
+        tags = ", ".join(dict.fromkeys(unchecked_elements))
+        if len(set(unchecked_elements)) == 1:
+            raise RuntimeError(f"Error processing element {tags}") from deferred_error
+        random.setstate(random_states[0])
+        np.random.set_state(random_states[1])
+        with (
+            measure(timings, "check_data"),
+            contextlib.redirect_stdout(io.StringIO()),
+            contextlib.redirect_stderr(io.StringIO()),
+        ):
+            replay_data = copy.deepcopy(original_data)
+            # This raises the error for the element that made the change.
+            process(
+                phase,
+                replay_data,
+                context,
+                original_data=original_data,
+                compare_each_element=True,
+            )
+        # The elements didn't make the same change again.
+        raise RuntimeError(
+            f"Error processing one of the elements {tags}"
+        ) from deferred_error
 
     if phase == "file":
         result = filelike_to_string(result)
@@ -212,35 +477,329 @@ def process(
     return result, processed_elements
 
 
+def find_render_pure_elements(
+    fragments: Fragments, elements: dict[str, ElementInfo]
+) -> list[lxml.html.HtmlElement]:
+    """
+    Find the elements that declare themselves `renderPure` and that aren't
+    nested inside another element, which would render them itself.
+
+    Returns:
+        The elements, in document order.
+    """
+    pure_tags = [tag for tag, info in elements.items() if info.get("renderPure")]
+    if not pure_tags:
+        return []
+    return [
+        element
+        for fragment in fragments
+        if isinstance(fragment, lxml.html.HtmlElement)
+        for element in fragment.iter(*pure_tags)
+        if not any(ancestor.tag in elements for ancestor in element.iterancestors())
+    ]
+
+
+def render_in_subprocesses(
+    elements: list[lxml.html.HtmlElement],
+    render: Callable[[lxml.html.HtmlElement], Any],
+    processes: int,
+) -> dict[lxml.html.HtmlElement, Any]:
+    """
+    Render elements in up to `processes` forked child processes. Threads
+    wouldn't help here, since rendering an element changes the working
+    directory and `sys.path` of the whole process.
+
+    Each child reseeds `random` and `numpy.random` with a seed that the
+    caller's `random` draws before forking, so children don't share one
+    sequence of random numbers and the caller's own sequence still advances
+    the same way every time. Each child sends back the HTML for its elements
+    along with anything they printed, which is then printed by the caller. If
+    a child can't be started or fails, or an element renders something other
+    than a string or `None`, none of that child's elements are included in the
+    result, so the caller renders them itself and any error (and output) is
+    produced as usual.
+
+    Returns:
+        The rendered HTML for each element that was rendered in a child.
+    """
+    num_children = min(processes, len(elements))
+    seeds = [random.getrandbits(32) for _ in range(num_children)]
+
+    # Anything still buffered would otherwise be written by every child, too.
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    children = []
+    for i in range(num_children):
+        chunk = elements[i::processes]
+        read_fd, write_fd = os.pipe()
+        try:
+            pid = os.fork()
+        except OSError:
+            # For example, if we've hit a process limit. The caller will
+            # render the remaining elements itself.
+            os.close(read_fd)
+            os.close(write_fd)
+            break
+        if pid == 0:
+            # This is the child; it must never return to the caller.
+            status = 1
+            try:
+                os.close(read_fd)
+                random.seed(seeds[i])
+                np.random.seed(seeds[i])
+                sys.stdout = stdout = io.StringIO()
+                sys.stderr = stderr = io.StringIO()
+                values = [render(element) for element in chunk]
+                if all(value is None or isinstance(value, str) for value in values):
+                    payload = {
+                        "values": [[isinstance(v, FinalHtml), v] for v in values],
+                        "stdout": stdout.getvalue(),
+                        "stderr": stderr.getvalue(),
+                    }
+                    with os.fdopen(write_fd, "w", encoding="utf-8") as f:
+                        json.dump(payload, f)
+                    status = 0
+            finally:
+                # `os._exit()` skips flushing anything written to the real
+                # streams directly.
+                for stream in (sys.__stdout__, sys.__stderr__):
+                    if stream is not None:
+                        stream.flush()
+                os._exit(status)
+        os.close(write_fd)
+        children.append((pid, read_fd, chunk))
+
+    rendered: dict[lxml.html.HtmlElement, Any] = {}
+    for pid, read_fd, chunk in children:
+        with os.fdopen(read_fd, encoding="utf-8") as f:
+            payload = f.read()
+        _, status = os.waitpid(pid, 0)
+        if status != 0:
+            continue
+        result = json.loads(payload)
+        sys.stdout.write(result["stdout"])
+        sys.stderr.write(result["stderr"])
+        for element, (final, value) in zip(chunk, result["values"], strict=True):
+            rendered[element] = FinalHtml(value) if final else value
+    return rendered
+
+
+# Element code checks for `dict` and `list`, and `check_data` requires them, so
+# these can't be a `UserDict` or `UserList`.
+class ReadOnlyDict(dict[Any, Any]):  # noqa: FURB189
+    """
+    A `dict` that can't be modified, so that it can be shared between elements.
+    Copies of it are ordinary, modifiable dicts.
+    """
+
+    __slots__ = ()
+
+    def _read_only(self) -> NoReturn:
+        raise TypeError("This dict is read-only; make a copy to modify it")
+
+    @override
+    def __setitem__(self, key: Any, value: Any) -> NoReturn:
+        self._read_only()
+
+    @override
+    def __delitem__(self, key: Any) -> NoReturn:
+        self._read_only()
+
+    @override
+    def __ior__(self, value: Any) -> Self:
+        self._read_only()
+
+    @override
+    def clear(self) -> NoReturn:
+        self._read_only()
+
+    @override
+    def pop(self, key: Any, default: Any = None) -> NoReturn:
+        self._read_only()
+
+    @override
+    def popitem(self) -> NoReturn:
+        self._read_only()
+
+    @override
+    def setdefault(self, key: Any, default: Any = None) -> NoReturn:
+        self._read_only()
+
+    @override
+    def update(self, *args: Any, **kwargs: Any) -> NoReturn:
+        self._read_only()
+
+    def __copy__(self) -> dict[Any, Any]:
+        """Return a modifiable shallow copy."""
+        return dict(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> dict[Any, Any]:
+        """Return a modifiable deep copy."""
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self) -> tuple[type, tuple[dict[Any, Any]]]:
+        """Pickle as a plain, modifiable copy."""
+        return (dict, (dict(self),))
+
+
+class ReadOnlyList(list[Any]):  # noqa: FURB189
+    """
+    A `list` that can't be modified, so that it can be shared between elements.
+    Copies of it are ordinary, modifiable lists.
+    """
+
+    __slots__ = ()
+
+    def _read_only(self) -> NoReturn:
+        raise TypeError("This list is read-only; make a copy to modify it")
+
+    @override
+    def __setitem__(self, index: Any, value: Any) -> NoReturn:
+        self._read_only()
+
+    @override
+    def __delitem__(self, index: Any) -> NoReturn:
+        self._read_only()
+
+    @override
+    def __iadd__(self, value: Any) -> Self:
+        self._read_only()
+
+    @override
+    def __imul__(self, value: Any) -> Self:
+        self._read_only()
+
+    @override
+    def append(self, value: Any) -> NoReturn:
+        self._read_only()
+
+    @override
+    def clear(self) -> NoReturn:
+        self._read_only()
+
+    @override
+    def extend(self, values: Any) -> NoReturn:
+        self._read_only()
+
+    @override
+    def insert(self, index: Any, value: Any) -> NoReturn:
+        self._read_only()
+
+    @override
+    def pop(self, index: Any = -1) -> NoReturn:
+        self._read_only()
+
+    @override
+    def remove(self, value: Any) -> NoReturn:
+        self._read_only()
+
+    @override
+    def reverse(self) -> NoReturn:
+        self._read_only()
+
+    @override
+    def sort(self, *, key: Any = None, reverse: bool = False) -> NoReturn:
+        self._read_only()
+
+    def __copy__(self) -> list[Any]:
+        """Return a modifiable shallow copy."""
+        return list(self)
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> list[Any]:
+        """Return a modifiable deep copy."""
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce__(self) -> tuple[type, tuple[list[Any]]]:
+        """Pickle as a plain, modifiable copy."""
+        return (list, (list(self),))
+
+
+def read_only(value: Any) -> Any:
+    """
+    Make a read-only copy of JSON-like data.
+
+    Returns:
+        The value, with every `dict` and `list` in it replaced by a
+        `ReadOnlyDict` or `ReadOnlyList`.
+    """
+    if isinstance(value, dict):
+        return ReadOnlyDict((key, read_only(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return ReadOnlyList(read_only(item) for item in value)
+    return value
+
+
+class PreparedElementData(NamedTuple):
+    extensions: ReadOnlyDict
+    client_files_element_url: str | None
+    client_files_extensions_url: ReadOnlyDict | None
+
+
 def prepare_data(
-    phase: Phase, data: dict[str, Any], context: RenderContext, element_tag: str
+    phase: Phase,
+    data: dict[str, Any],
+    context: RenderContext,
+    element_tag: str,
+    prepared: dict[str, PreparedElementData] | None = None,
 ) -> None:
-    element_extensions = context["element_extensions"]
-    element_info = context["elements"][element_tag]
-
-    # Make a deep copy of the data so that question/element code can't
-    # modify the source data.
-    data["extensions"] = copy.deepcopy(element_extensions.get(element_tag, {}))
+    """
+    Add the element-specific `extensions` and, when rendering, the URLs of the
+    element's client files to `data`.
+
+    These are read-only, so that element code can't modify the source data,
+    and are the same for every element with the same tag. If `prepared` is
+    given, they're computed once per tag and stored there for later elements
+    during the same phase.
+    """
+    element_data = None if prepared is None else prepared.get(element_tag)
+    if element_data is None:
+        element_data = _prepare_element_data(phase, data, context, element_tag)
+        if prepared is not None:
+            prepared[element_tag] = element_data
+
+    data["extensions"] = element_data.extensions
 
     # `*_url` options are only present during the render phase.
     if phase == "render":
-        client_files_element_url = (
-            pathlib.Path(data["options"]["course_element_files_url"])
-            / element_info["name"]
-            / "clientFilesElement"
-        ).as_posix()
-        client_files_extensions_url = {
-            extension: (
+        data["options"]["client_files_element_url"] = (
+            element_data.client_files_element_url
+        )
+        data["options"]["client_files_extensions_url"] = (
+            element_data.client_files_extensions_url
+        )
+
+
+def _prepare_element_data(
+    phase: Phase, data: dict[str, Any], context: RenderContext, element_tag: str
+) -> PreparedElementData:
+    element_extensions = context["element_extensions"]
+    element_info = context["elements"][element_tag]
+    extensions = read_only(element_extensions.get(element_tag, {}))
+
+    if phase != "render":
+        return PreparedElementData(extensions, None, None)
+
+    client_files_element_url = (
+        pathlib.Path(data["options"]["course_element_files_url"])
+        / element_info["name"]
+        / "clientFilesElement"
+    ).as_posix()
+    client_files_extensions_url = ReadOnlyDict(
+        (
+            extension,
+            (
                 pathlib.Path(data["options"]["course_element_extension_files_url"])
                 / element_info["name"]
                 / extension
                 / "clientFilesExtension"
-            ).as_posix()
-            for extension in data["extensions"]
-        }
-
-        data["options"]["client_files_element_url"] = client_files_element_url
-        data["options"]["client_files_extensions_url"] = client_files_extensions_url
+            ).as_posix(),
+        )
+        for extension in extensions
+    )
+    return PreparedElementData(
+        extensions, client_files_element_url, client_files_extensions_url
+    )
 
 
 def restore_data(data: dict[str, Any]) -> None:
@@ -0,0 +1,101 @@
+"""
+A statistical profiler for finding out where slow question code spends its
+time, without any dependencies outside the standard library.
+
+The profiler samples the stack of the main thread every time the process has
+used `interval` seconds of CPU time, using `SIGPROF`. Samples are reported as
+collapsed stacks (one `frame;frame;frame count` line per distinct stack),
+which most flame graph tools accept directly.
+
+The kernel delivers `SIGPROF` at most once per scheduler tick (commonly every
+4 ms), so shorter intervals don't produce more samples.
+"""
+
+import signal
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable
+from types import CodeType, FrameType
+from typing import ParamSpec, TypeVar
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+DEFAULT_INTERVAL = 0.005
+MAX_STACK_DEPTH = 100
+MAX_STACKS = 500
+
+
+def format_frame(code: CodeType) -> str:
+    # `;` separates frames in the collapsed format.
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})".replace(
+        ";", ":"
+    )
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL) -> None:
+        self.interval = interval
+        self.counts: Counter[tuple[CodeType, ...]] = Counter()
+        self.cpu_time = 0.0
+        self._root: FrameType | None = None
+
+    def _sample(self, _signum: int, frame: FrameType | None) -> None:
+        stack: list[CodeType] = []
+        while frame is not None and frame is not self._root:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        # The innermost frame is this handler's caller; stacks are reported
+        # starting from the outermost frame.
+        stack.reverse()
+        self.counts[tuple(stack)] += 1
+
+    def run(self, fn: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """
+        Call `fn` while sampling its stack. Samples are added to any from
+        previous runs. Frames outside of the call to `fn` aren't included.
+
+        Returns:
+            The return value of `fn`.
+        """
+        self._root = sys._getframe()
+        previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        start = time.process_time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous_handler)
+            self.cpu_time += time.process_time() - start
+            self._root = None
+
+    def collapsed_stacks(
+        self, *, max_depth: int = MAX_STACK_DEPTH, max_stacks: int = MAX_STACKS
+    ) -> tuple[str, bool]:
+        """
+        Format the samples as collapsed stacks. Stacks deeper than `max_depth`
+        keep their outermost frames. If there are more than `max_stacks`
+        distinct stacks, only the most common are kept and the remaining
+        samples are reported under a single `[truncated]` stack.
+
+        Returns:
+            The collapsed stacks, one per line, and whether any stacks were
+            shortened or dropped.
+        """
+        truncated = False
+        counts: Counter[str] = Counter()
+        for stack, count in self.counts.items():
+            frames = [format_frame(code) for code in stack[:max_depth]]
+            if len(stack) > max_depth:
+                frames.append("[truncated]")
+                truncated = True
+            counts[";".join(frames)] += count
+
+        lines = [f"{stack} {count}" for stack, count in counts.most_common(max_stacks)]
+        if len(counts) > max_stacks:
+            truncated = True
+            dropped = sum(count for _, count in counts.most_common()[max_stacks:])
+            lines.append(f"[truncated] {dropped}")
+        return "\n".join(lines), truncated
@@ -1,12 +1,17 @@
-from collections import deque
-from collections.abc import Callable
+import copy
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
 from html import escape as html_escape
 from html import unescape as html_unescape
 from itertools import chain
 
 import lxml.html
 
+from prairielearn.html_utils import FinalHtml
+
 ElementReplacement = str | lxml.html.HtmlElement | list[lxml.html.HtmlElement] | None
+Fragments = list[str | lxml.html.HtmlElement]
 
 # https://developer.mozilla.org/en-US/docs/Glossary/Void_element
 VOID_ELEMENTS = frozenset({
@@ -27,11 +32,122 @@ VOID_ELEMENTS = frozenset({
 
 UNESCAPED_ELEMENTS = frozenset({"script", "style"})
 
+# The number of distinct documents whose parsed fragments are kept. Workers
+# are restarted after every question, so the cache only helps within the calls
+# that one worker handles for a question: `parse` followed by `grade`, or a
+# `render` for each of the question, submission, and answer panels. Unless
+# the template uses Mustache to insert something like the submitted answers,
+# those all process the same HTML, so a worker rarely needs more than one
+# entry. The limit only bounds how much a worker that is kept around longer
+# holds on to.
+FRAGMENT_CACHE_SIZE = 4
+
+
+@dataclass
+class _ParsedHtml:
+    fragments: Fragments
+    # Elements with any of the given tags, in document order.
+    elements_by_tags: dict[frozenset[str], list[lxml.html.HtmlElement]] = field(
+        default_factory=dict
+    )
+
+
+# Parsed HTML, keyed by the HTML it was parsed from and ordered from least to
+# most recently used.
+_fragment_cache: OrderedDict[str, _ParsedHtml] = OrderedDict()
+
+
+def _parse_cached(html: str) -> _ParsedHtml:
+    parsed = _fragment_cache.get(html)
+    if parsed is None:
+        parsed = _ParsedHtml(lxml.html.fragments_fromstring(html))
+        _fragment_cache[html] = parsed
+        while len(_fragment_cache) > FRAGMENT_CACHE_SIZE:
+            _fragment_cache.popitem(last=False)
+    else:
+        _fragment_cache.move_to_end(html)
+    return parsed
+
+
+def parse_fragments(html: str) -> Fragments:
+    """
+    Parse HTML like `lxml.html.fragments_fromstring`, reusing the result of a
+    previous call with the same HTML if possible. The returned fragments are
+    shared between calls, so they must not be modified; use `copy_fragments`
+    to get a copy that can be.
+
+    Returns:
+        The parsed elements, preceded by any leading text.
+    """
+    return _parse_cached(html).fragments
+
+
+def copy_fragments(fragments: Fragments) -> Fragments:
+    """
+    Copy fragments returned by `parse_fragments`.
+
+    Returns:
+        A deep copy of the fragments.
+    """
+    leading_text = [f for f in fragments[:1] if isinstance(f, str)]
+    if len(fragments) == len(leading_text):
+        return leading_text
+    # All fragments are children of the same `<body>` element, and copying
+    # it in one go is much cheaper than copying each fragment separately.
+    # Copying an `lxml` element also copies all of its descendants.
+    last = fragments[-1]
+    assert not isinstance(last, str), "Only the first fragment can be text"
+    body = last.getparent()
+    return [*leading_text, *copy.copy(body)]
+
+
+def find_elements(html: str, tags: Iterable[str]) -> list[lxml.html.HtmlElement]:
+    """
+    Find the elements in the HTML with any of the given tags, including ones
+    nested inside each other, in document order. Like the fragments returned
+    by `parse_fragments`, the elements are shared between calls and must not
+    be modified.
+
+    Returns:
+        The matching elements.
+    """
+    parsed = _parse_cached(html)
+    tag_set = frozenset(tags)
+    elements = parsed.elements_by_tags.get(tag_set)
+    if elements is None:
+        # `iter()` without any tags would match every element.
+        elements = (
+            [
+                e
+                for fragment in parsed.fragments
+                if isinstance(fragment, lxml.html.HtmlElement)
+                for e in fragment.iter(*tag_set)
+            ]
+            if tag_set
+            else []
+        )
+        parsed.elements_by_tags[tag_set] = elements
+    return elements
+
 
 def traverse_and_execute(
-    html: str, fn: Callable[[lxml.html.HtmlElement], None]
+    html: str,
+    fn: Callable[[lxml.html.HtmlElement], None],
+    *,
+    tags: Iterable[str] | None = None,
 ) -> None:
-    elements = lxml.html.fragments_fromstring(html)
+    """
+    Call `fn` on every element in the HTML, in document order. If `tags` is
+    given, `fn` is only called on the elements with one of those tags, which
+    are found without visiting the rest of the document. The parsed HTML may
+    be shared with other calls, so `fn` must not modify the elements.
+    """
+    if tags is not None:
+        for e in find_elements(html, tags):
+            fn(e)
+        return
+
+    elements = parse_fragments(html)
 
     for e in chain.from_iterable(
         element.iter()
@@ -68,26 +184,55 @@ def get_source_definition(element: lxml.html.HtmlElement) -> str:
 # again. Escaping will only escape `&`, `<`, and `>`; it won't escape everything
 # that could possibly be represented by a named entity.
 def prepare_text(text: str) -> str:
+    # Only text with an `&` can contain entities. Much of the text between
+    # elements is just whitespace, so skip the round trip for everything else.
+    if "&" not in text:
+        return html_escape(text)
     return html_escape(html_unescape(text))
 
 
 def traverse_and_replace(
-    html: str, replace: Callable[[lxml.html.HtmlElement], ElementReplacement]
+    html: str | Fragments,
+    replace: Callable[[lxml.html.HtmlElement], ElementReplacement],
 ) -> str:
     """
     Perform traversal and element replacement on HTML with the given replace function.
+    See `traverse_and_write` for details.
+
+    Returns:
+        The resulting HTML.
+    """
+    result: list[str] = []
+    traverse_and_write(html, replace, result.append)
+    return "".join(result)
+
+
+def traverse_and_write(
+    html: str | Fragments,
+    replace: Callable[[lxml.html.HtmlElement], ElementReplacement],
+    write: Callable[[str], object],
+) -> None:
+    """
+    Perform traversal and element replacement on HTML with the given replace function,
+    passing the resulting HTML to `write` piece by piece as it is produced.
     In short, uses stacks to track what has been parsed already and what still needs to be parsed.
     The count_stack tracks how many children each unclosed tag (contained in the tail_stack) has.
-    The top entry in count_stack is decremented every time something is moved onto result,
-    and when an entry hits zero, the corresponding tag from tail_stack is moved onto result as well.
+    The top entry in count_stack is decremented every time something is written,
+    and when an entry hits zero, the corresponding tag from tail_stack is written as well.
+
+    HTML that `replace` returns as a string is parsed and traversed in turn, unless it
+    is a `FinalHtml`, which is written as-is.
+
+    The HTML can also be given as fragments from `copy_fragments`, which are traversed
+    directly, so that `replace` can recognize elements that the caller found in them.
 
     Raises:
         TypeError: If the HTML contains an invalid tag.
     """
-    # Initialize result and work data structures
-    result: deque[str] = deque()
-
-    initial_list = lxml.html.fragments_fromstring(html)
+    # Initialize work data structures
+    initial_list = (
+        copy_fragments(parse_fragments(html)) if isinstance(html, str) else html
+    )
     count_stack: deque[int] = deque([len(initial_list)])
     work_stack: deque[str | lxml.html.HtmlElement] = deque(reversed(initial_list))
     tail_stack: deque[tuple[str, str | None]] = deque()
@@ -95,9 +240,9 @@ def traverse_and_replace(
     while work_stack:
         element = work_stack.pop()
 
-        # For just a string, append to final result
+        # For just a string, write it directly
         if isinstance(element, str):
-            result.append(element)
+            write(element)
 
         else:
             new_elements = replace(element)
@@ -105,15 +250,18 @@ def traverse_and_replace(
             # Turn new_elements into a list containing we can process
             if new_elements is None:
                 new_elements = []
-            elif isinstance(new_elements, str):
+            elif isinstance(new_elements, str) and not isinstance(
+                new_elements, FinalHtml
+            ):
                 fragments = lxml.html.fragments_fromstring(new_elements)
                 new_elements = fragments
 
             if isinstance(new_elements, list):
-                # Add element tail before processing replaced element
+                # Add element tail before processing replaced element. Like the
+                # tails written in the other branches, it has to be escaped again.
                 if element.tail is not None:
                     count_stack[-1] += 1
-                    work_stack.append(element.tail)
+                    work_stack.append(prepare_text(element.tail))
 
                 # If there are new elements, extend and go to the next iteration
                 if len(new_elements) > 0:
@@ -122,8 +270,12 @@ def traverse_and_replace(
                     work_stack.extend(reversed(new_elements))
                     continue
 
+            elif isinstance(new_elements, FinalHtml):
+                write(new_elements)
+                if element.tail is not None:
+                    write(prepare_text(element.tail))
             elif isinstance(new_elements, lxml.html.HtmlComment):
-                result.append(lxml.html.tostring(new_elements, encoding="unicode"))
+                write(lxml.html.tostring(new_elements, encoding="unicode"))
             elif isinstance(new_elements, lxml.html.HtmlProcessingInstruction):
                 # Handling processing instructions is necessary for elements like `<pl-graph>`
                 # that produce SVG documents.
@@ -138,20 +290,20 @@ def traverse_and_replace(
                     .removeprefix("<?")
                     .removesuffix("?>")
                 )
-                result.append(f"<!--?{instruction}?-->")
+                write(f"<!--?{instruction}?-->")
                 if tail:
-                    result.append(prepare_text(tail))
+                    write(prepare_text(tail))
             else:
                 if not isinstance(new_elements.tag, str):
                     raise TypeError(f"Invalid tag type: {type(new_elements.tag)}")
 
                 # Add opening tag and text
-                result.append(get_source_definition(new_elements))
+                write(get_source_definition(new_elements))
                 if new_elements.text is not None:
                     if new_elements.tag in UNESCAPED_ELEMENTS:
-                        result.append(new_elements.text)
+                        write(new_elements.text)
                     else:
-                        result.append(prepare_text(new_elements.text))
+                        write(prepare_text(new_elements.text))
 
                 # Add all children to the work stack
                 children = list(new_elements)
@@ -171,9 +323,9 @@ def traverse_and_replace(
             tail_tag, tail_text = tail_stack.pop()
 
             if tail_tag not in VOID_ELEMENTS:
-                result.append(f"</{tail_tag}>")
+                write(f"</{tail_tag}>")
             if tail_text is not None:
-                result.append(tail_text)
+                write(tail_text)
 
         count_stack[-1] -= 1
 
@@ -182,5 +334,3 @@ def traverse_and_replace(
     #
     # assert count_stack == deque([0])
     # assert not tail_stack
-
-    return "".join(result)
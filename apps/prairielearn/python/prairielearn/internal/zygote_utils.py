@@ -1,7 +1,26 @@
+import json
 from typing import Any
 
 import prairielearn as pl
 
+# Any integer that is too large for JavaScript has at least as many digits as
+# 2**53.
+_MIN_OVERSIZED_DIGITS = b"0" * len(str(2**53))
+
+
+def _make_integer_table() -> bytes:
+    table = bytearray(b"_" * 256)
+    for char in b"0123456789":
+        table[char] = ord("0")
+    # Everything that can come right before the digits of an integer, or of an
+    # integer dict key, which is encoded as a string.
+    for char in b'[,: \t\n\r-"':
+        table[char] = ord("X")
+    return bytes(table)
+
+
+_INTEGER_TABLE = _make_integer_table()
+
 
 def safe_parse_int(int_str: str) -> int | float:
     """
@@ -45,6 +64,42 @@ def assert_all_integers_within_limits(item: Any) -> None:
             item_stack.extend(next_item.values())
 
 
+def may_contain_oversized_integer(json_str: str | bytes) -> bool:
+    """
+    Quickly check whether JSON might contain an integer that cannot be
+    losslessly parsed into a JavaScript number, without parsing it.
+
+    This maps every byte to a digit, a byte that can start an integer, or
+    neither, and searches for a long enough run of digits. It can report
+    integers that aren't there, such as in strings of digits or in floats
+    like `9007199254740992.5`, but never misses one, including integer keys
+    of a dict that has been encoded.
+
+    Returns:
+        `False` if there are no oversized integers.
+    """
+    if isinstance(json_str, str):
+        json_str = json_str.encode("utf-8", "surrogatepass")
+    mapped = json_str.translate(_INTEGER_TABLE)
+    return (
+        mapped.startswith(_MIN_OVERSIZED_DIGITS)
+        or b"X" + _MIN_OVERSIZED_DIGITS in mapped
+    )
+
+
+def parse_json(json_str: str | bytes) -> Any:
+    """
+    Parse JSON like `json.loads(json_str, parse_int=safe_parse_int)`, but let
+    the C parser handle integers unless there might be oversized ones.
+
+    Returns:
+        The parsed value, with oversized integers parsed as floats.
+    """
+    if may_contain_oversized_integer(json_str):
+        return json.loads(json_str, parse_int=safe_parse_int)
+    return json.loads(json_str)
+
+
 def get_module_function(mod: dict[str, Any], fcn: str) -> Any:
     if fcn not in mod:
         return None
@@ -5,6 +5,8 @@ from prairielearn import ...
 ```
 """
 
+import copy
+import functools
 import itertools as it
 import os
 import random
@@ -12,11 +14,14 @@ import string
 import unicodedata
 import uuid
 from collections.abc import Callable, Generator, Iterable
-from typing import TypeVar
+from typing import Any, TypeVar
 
 from pint import UnitRegistry
+from pint.facets.plain import PlainQuantity
 from text_unidecode import unidecode
 
+_unit_registry: UnitRegistry | None = None
+
 
 def iter_keys() -> Generator[str, None, None]:
     """A continuous alphabetic list of the form `['a', 'b', ..., 'z', 'aa', 'ab', ..., 'zz', 'aaa', 'aab', ...]`.
@@ -43,17 +48,73 @@ def index2key(i: int) -> str:
     return next(it.islice(iter_keys(), i, None))
 
 
+class _SharedUnitRegistry(UnitRegistry):
+    """A unit registry that forgets the quantities cached by `parse_quantity` whenever units are defined on it."""
+
+    def define(self, definition: Any) -> None:
+        super().define(definition)
+        _parse_quantity.cache_clear()
+
+    def load_definitions(self, file: Any, is_resource: bool = False) -> Any:  # noqa: FBT001, FBT002
+        parsed_project = super().load_definitions(file, is_resource)
+        _parse_quantity.cache_clear()
+        return parsed_project
+
+
 def get_unit_registry() -> UnitRegistry:
-    """Get a unit registry using cache folder valid on production machines.
+    """Get the unit registry shared by all code in this process, using a cache folder valid on production machines.
+
+    The registry is created the first time this is called. The zygote does so
+    before it forks, so workers inherit the registry instead of spending on
+    the order of 100 ms creating their own. Units defined on it remain defined
+    for the lifetime of the process.
+
+    Since all code in the process shares the registry, callers must not change
+    its settings (such as `default_format` or `case_sensitive`), which would
+    change how every other caller parses and formats quantities.
 
     <https://pint.readthedocs.io/en/stable/index.html>
 
     Returns:
-        A process-specific unit registry.
+        The process-wide unit registry.
+    """
+    global _unit_registry  # noqa: PLW0603
+    if _unit_registry is None:
+        pid = os.getpid()
+        cache_dir = f"/tmp/pint_{pid}"
+        _unit_registry = _SharedUnitRegistry(cache_folder=cache_dir)
+    return _unit_registry
+
+
+def parse_quantity(quantity: str) -> PlainQuantity[Any]:
+    """Parse a quantity like `get_unit_registry().Quantity(quantity)`, reusing the result if the same string was parsed before.
+
+    Results are only reused while the registry's units and all of its settings
+    that affect parsing stay the same. Formatting settings are only read when
+    a quantity is formatted, so they don't affect the results.
+
+    Returns:
+        A copy of the parsed quantity, which can be modified without affecting later calls.
     """
-    pid = os.getpid()
-    cache_dir = f"/tmp/pint_{pid}"
-    return UnitRegistry(cache_folder=cache_dir)
+    ureg = get_unit_registry()
+    settings = (
+        ureg.case_sensitive,
+        ureg.non_int_type,
+        ureg.autoconvert_offset_to_baseunit,
+        ureg.autoconvert_to_preferred,
+        ureg.auto_reduce_dimensions,
+        ureg.default_as_delta,
+        ureg.default_system,
+        ureg.force_ndarray,
+        ureg.force_ndarray_like,
+        tuple(ureg.preprocessors),
+    )
+    return copy.copy(_parse_quantity(quantity, settings))
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_quantity(quantity: str, settings: tuple[Any, ...]) -> PlainQuantity[Any]:  # noqa: ARG001
+    return get_unit_registry().Quantity(quantity)
 
 
 def full_unidecode(input_str: str) -> str:
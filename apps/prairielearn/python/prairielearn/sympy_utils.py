@@ -6,16 +6,20 @@ from prairielearn.sympy_utils import ...
 """
 
 import ast
-import copy
+import cmath
+import functools
 import html
-from collections import deque
-from collections.abc import Callable, Iterable
+import random
+from collections import OrderedDict, deque
+from collections.abc import Callable, Hashable, Iterable, Mapping
 from dataclasses import dataclass
 from tokenize import TokenError
-from types import CodeType
-from typing import Any, Literal, TypedDict, TypeGuard, cast
+from types import CodeType, MappingProxyType
+from typing import Any, Literal, NamedTuple, TypedDict, TypeGuard, cast
 
+import numpy as np
 import sympy
+from sympy.core.function import AppliedUndef
 from sympy.parsing.sympy_parser import (
     eval_expr,
     evaluateFalse,
@@ -147,6 +151,175 @@ class _Constants:
         }
 
 
+# Shared by everything in this module that only reads the constants.
+_CONSTANTS = _Constants()
+
+# Global dict is set up to be very permissive for parsing purposes (makes it
+# cleaner to call `evaluate` with a custom locals dict). Building it takes a
+# few hundred microseconds, so it's built once and shared by all calls. This
+# is safe because the AST check only allows expressions that can't assign to
+# it.
+_GLOBAL_DICT: dict[str, Any] = {}
+exec("from sympy import *", _GLOBAL_DICT)
+
+# Names that appear in expressions after SymPy stringification. They're only
+# used for the AST check, so they don't change what gets parsed.
+_STRINGIFIED_FUNCTIONS: SympyFunctionMapT = {
+    "Integer": sympy.Integer,
+    "Symbol": sympy.Symbol,
+    "Float": sympy.Float,
+}
+_STRINGIFIED_VARIABLES: SympyMapT = {"I": sympy.I, "oo": sympy.oo}
+
+
+# Marks a key that isn't in a `_ParseCache`.
+_MISSING = object()
+
+
+class _ParseCache:
+    """A least-recently-used cache of parsing results that counts its hits and misses."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Look up a cached result.
+
+        Returns:
+            The result, or `_MISSING` if it isn't cached.
+        """
+        value = self.entries.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache a result, evicting the least recently used one if the cache is full."""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all results and reset the hit and miss counters."""
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """Report how much the cache holds and how often it has been used.
+
+        Returns:
+            The number of entries, and the number of hits and misses.
+        """
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+# Questions often parse the same strings several times in one request, like
+# an element's correct answer in every phase, or a submission that is
+# validated before it is parsed. SymPy expressions are immutable, so parsed
+# expressions can be shared. Only successful results are cached; invalid
+# input raises again every time.
+_conversion_cache = _ParseCache(max_entries=1024)
+_stringify_cache = _ParseCache(max_entries=1024)
+_ast_check_cache = _ParseCache(max_entries=1024)
+
+
+def parse_cache_stats() -> dict[str, dict[str, int]]:
+    """Report how often the caches used while parsing expressions were hit.
+
+    `conversions` caches the results of [convert_string_to_sympy][prairielearn.sympy_utils.convert_string_to_sympy]
+    and related functions, `stringify` caches the Python code that SymPy generates for an
+    expression, and `ast_check` caches which code passed the security check.
+
+    Returns:
+        The number of entries, hits, and misses of each cache since the process started.
+    """
+    return {
+        "conversions": _conversion_cache.stats(),
+        "stringify": _stringify_cache.stats(),
+        "ast_check": _ast_check_cache.stats(),
+    }
+
+
+def clear_parse_caches() -> None:
+    """Empty the caches used while parsing expressions and reset their counters."""
+    _conversion_cache.clear()
+    _stringify_cache.clear()
+    _ast_check_cache.clear()
+
+
+def _hashable_or_none(key: Hashable) -> Hashable | None:
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _freeze_assumptions(assumptions: AssumptionsDictT | None) -> Any:
+    """Convert assumptions to a form that can be part of a cache key.
+
+    Returns:
+        The assumptions as sorted tuples, `None` if there are none, or
+        `_MISSING` if they aren't a dict of dicts.
+    """
+    if assumptions is None:
+        return None
+    if not isinstance(assumptions, dict) or not all(
+        isinstance(value, dict) for value in assumptions.values()
+    ):
+        return _MISSING
+    return tuple(
+        sorted(
+            (name, tuple(sorted(value.items()))) for name, value in assumptions.items()
+        )
+    )
+
+
+class _BaseLocals(NamedTuple):
+    functions: Mapping[str, Callable[..., Any]]
+    variables: Mapping[str, sympy.Basic | complex]
+    helpers: Mapping[str, Callable[..., Any]]
+    names: frozenset[str]
+
+
+@functools.cache
+def _get_base_locals(
+    *, allow_hidden: bool, allow_complex: bool, allow_trig_functions: bool
+) -> _BaseLocals:
+    """Get the functions and variables that are allowed in every expression parsed with these options.
+
+    Returns:
+        Read-only mappings, which callers copy before adding their own names.
+    """
+    functions = dict(_CONSTANTS.functions)
+    variables = dict(_CONSTANTS.variables)
+    helpers = dict(_CONSTANTS.helpers)
+
+    if allow_hidden:
+        variables.update(_CONSTANTS.hidden_variables)
+    if allow_complex:
+        variables.update(_CONSTANTS.complex_variables)
+        if allow_hidden:
+            variables.update(_CONSTANTS.hidden_complex_variables)
+
+    if allow_trig_functions:
+        functions.update(_CONSTANTS.trig_functions)
+
+    return _BaseLocals(
+        functions=MappingProxyType(functions),
+        variables=MappingProxyType(variables),
+        helpers=MappingProxyType(helpers),
+        names=frozenset(functions.keys() | variables.keys() | helpers.keys()),
+    )
+
+
 # Safe evaluation of user input to convert from string to sympy expression.
 #
 # Adapted from:
@@ -463,43 +636,50 @@ def evaluate_with_source(
     # Based on code here:
     # https://github.com/sympy/sympy/blob/26f7bdbe3f860e7b4492e102edec2d6b429b5aaf/sympy/parsing/sympy_parser.py#L1086
 
-    # Global dict is set up to be very permissive for parsing purposes
-    # (makes it cleaner to call this function with a custom locals dict).
-    # This line shouldn't be dangerous, as it's just loading the global dict.
-    global_dict = {}
-    exec("from sympy import *", global_dict)
-
     transformations = (*standard_transformations, implicit_multiplication_application)
 
+    # The code only depends on the expression and the locals, since the
+    # global dict never changes. Building the set hashes the locals, so it
+    # fails if any of them can't be part of a key.
     try:
-        code = stringify_expr(expr, local_dict, global_dict, transformations)
-    except TokenError as exc:
-        raise HasParseError(-1) from exc
-
-    # First do AST check, mainly for security
-    parsed_locals_to_eval = copy.deepcopy(locals_for_eval)
-
-    # Add locals that appear after sympy stringification
-    # This check is only for safety, so won't change what gets parsed
-    parsed_locals_to_eval["functions"].update(
-        Integer=sympy.Integer,
-        Symbol=sympy.Symbol,
-        Float=sympy.Float,
-    )
-
-    parsed_locals_to_eval["variables"].update(
-        I=sympy.I,
-        oo=sympy.oo,
+        stringify_key = (expr, frozenset(local_dict.items()))
+    except TypeError:
+        stringify_key = None
+    code: str | CodeType | None = None
+    if stringify_key is not None:
+        cached_code = _stringify_cache.get(stringify_key)
+        if cached_code is not _MISSING:
+            code = cast(str, cached_code)
+    if code is None:
+        try:
+            code = stringify_expr(expr, local_dict, _GLOBAL_DICT, transformations)
+        except TokenError as exc:
+            raise HasParseError(-1) from exc
+        if stringify_key is not None:
+            _stringify_cache.put(stringify_key, code)
+
+    # First do AST check, mainly for security. It only depends on the names of
+    # the allowed variables and functions.
+    ast_check_key = (
+        code,
+        frozenset(locals_for_eval["variables"]),
+        frozenset(locals_for_eval["functions"]),
     )
-
-    ast_check_str(code, parsed_locals_to_eval)
+    if _ast_check_cache.get(ast_check_key) is _MISSING:
+        parsed_locals_to_eval: LocalsForEval = {
+            "functions": {**locals_for_eval["functions"], **_STRINGIFIED_FUNCTIONS},
+            "variables": {**locals_for_eval["variables"], **_STRINGIFIED_VARIABLES},
+            "helpers": locals_for_eval["helpers"],
+        }
+        ast_check_str(code, parsed_locals_to_eval)
+        _ast_check_cache.put(ast_check_key, None)
 
     if not simplify_expression:
         code = compile(evaluateFalse(code), "<string>", "eval")
 
     # Now that it's safe, get sympy expression
     try:
-        res = eval_expr(code, local_dict, global_dict)
+        res = eval_expr(code, local_dict, _GLOBAL_DICT)
     except Exception as exc:
         raise BaseSympyError from exc
 
@@ -573,37 +753,158 @@ def convert_string_to_sympy_with_source(
     the variables and functions that can be used. If the string is invalid,
     raise an exception with a message that can be displayed to the user.
 
+    Results are cached, so converting the same string with the same options
+    again is cheap; see [parse_cache_stats][prairielearn.sympy_utils.parse_cache_stats].
+
     Returns:
         A tuple of the sympy expression and the source code that was used to generate it.
+    """
+    return _convert_strings_to_sympy_with_source(
+        [expr],
+        variables,
+        allow_hidden=allow_hidden,
+        allow_complex=allow_complex,
+        allow_trig_functions=allow_trig_functions,
+        simplify_expression=simplify_expression,
+        custom_functions=custom_functions,
+        assumptions=assumptions,
+    )[0]
+
+
+def convert_strings_to_sympy(
+    exprs: Iterable[str],
+    variables: Iterable[str] | None = None,
+    *,
+    allow_hidden: bool = False,
+    allow_complex: bool = False,
+    allow_trig_functions: bool = True,
+    simplify_expression: bool = True,
+    custom_functions: Iterable[str] | None = None,
+    assumptions: AssumptionsDictT | None = None,
+) -> list[sympy.Expr]:
+    """
+    Convert many strings to SymPy expressions with the same options, like the
+    cells of a matrix. This gives the same results as calling
+    [convert_string_to_sympy][prairielearn.sympy_utils.convert_string_to_sympy]
+    for each string, but the allowed variables and functions are only set up
+    once, and strings that appear more than once are only converted once.
+
+    Examples:
+        >>> convert_strings_to_sympy(["x", "0", "x + 1", "0"], variables=["x"])
+        [x, 0, x + 1, 0]
+
+    Returns:
+        A list of SymPy expressions, in the same order as the strings.
+    """
+    return [
+        result[0]
+        for result in _convert_strings_to_sympy_with_source(
+            list(exprs),
+            variables,
+            allow_hidden=allow_hidden,
+            allow_complex=allow_complex,
+            allow_trig_functions=allow_trig_functions,
+            simplify_expression=simplify_expression,
+            custom_functions=custom_functions,
+            assumptions=assumptions,
+        )
+    ]
+
+
+def _convert_strings_to_sympy_with_source(
+    exprs: list[str],
+    variables: Iterable[str] | None,
+    *,
+    allow_hidden: bool,
+    allow_complex: bool,
+    allow_trig_functions: bool,
+    simplify_expression: bool,
+    custom_functions: Iterable[str] | None,
+    assumptions: AssumptionsDictT | None,
+) -> list[tuple[sympy.Expr, str | CodeType]]:
+    if variables is not None:
+        variables = tuple(variables)
+    if custom_functions is not None:
+        custom_functions = tuple(custom_functions)
+    frozen_assumptions = _freeze_assumptions(assumptions)
+    options_key = _hashable_or_none((
+        variables,
+        custom_functions,
+        frozen_assumptions,
+        allow_hidden,
+        allow_complex,
+        allow_trig_functions,
+        simplify_expression,
+    ))
+    if frozen_assumptions is _MISSING:
+        options_key = None
+
+    # Only set up when a string isn't cached.
+    locals_for_eval: LocalsForEval | None = None
+    results: dict[str, tuple[sympy.Expr, str | CodeType]] = {}
+    for expr in exprs:
+        if expr in results:
+            continue
+        key = None if options_key is None else (expr, options_key)
+        cached_result = _conversion_cache.get(key) if key is not None else _MISSING
+        if cached_result is not _MISSING:
+            result = cast(tuple[sympy.Expr, str | CodeType], cached_result)
+        else:
+            if locals_for_eval is None:
+                locals_for_eval = _make_locals_for_eval(
+                    variables,
+                    allow_hidden=allow_hidden,
+                    allow_complex=allow_complex,
+                    allow_trig_functions=allow_trig_functions,
+                    custom_functions=custom_functions,
+                    assumptions=assumptions,
+                )
+            result = evaluate_with_source(
+                expr,
+                locals_for_eval,
+                allow_complex=allow_complex,
+                simplify_expression=simplify_expression,
+            )
+            if key is not None:
+                _conversion_cache.put(key, result)
+        results[expr] = result
+    return [results[expr] for expr in exprs]
+
+
+def _make_locals_for_eval(
+    variables: Iterable[str] | None,
+    *,
+    allow_hidden: bool,
+    allow_complex: bool,
+    allow_trig_functions: bool,
+    custom_functions: Iterable[str] | None,
+    assumptions: AssumptionsDictT | None,
+) -> LocalsForEval:
+    """Set up the variables and functions that are allowed in expressions.
+
+    Returns:
+        The allowed names, to be passed to [evaluate_with_source][prairielearn.sympy_utils.evaluate_with_source].
 
     Raises:
         HasInvalidAssumptionError: If the assumptions are not valid.
         HasConflictingVariableError: If the variable names conflict with existing names.
         HasConflictingFunctionError: If the function names conflict with existing names.
     """
-    const = _Constants()
+    base_locals = _get_base_locals(
+        allow_hidden=allow_hidden,
+        allow_complex=allow_complex,
+        allow_trig_functions=allow_trig_functions,
+    )
 
     # Create a whitelist of valid functions and variables (and a special flag
     # for numbers that are converted to sympy integers).
     locals_for_eval: LocalsForEval = {
-        "functions": const.functions,
-        "variables": const.variables,
-        "helpers": const.helpers,
+        "functions": dict(base_locals.functions),
+        "variables": dict(base_locals.variables),
+        "helpers": dict(base_locals.helpers),
     }
 
-    if allow_hidden:
-        locals_for_eval["variables"].update(const.hidden_variables)
-    if allow_complex:
-        locals_for_eval["variables"].update(const.complex_variables)
-        if allow_hidden:
-            locals_for_eval["variables"].update(const.hidden_complex_variables)
-
-    if allow_trig_functions:
-        locals_for_eval["functions"].update(const.trig_functions)
-
-    used_names = set().union(
-        *(cast(SympyMapT, inner_dict).keys() for inner_dict in locals_for_eval.values())
-    )
+    used_names = set(base_locals.names)
 
     # Check assumptions are all made about valid variables only
     if assumptions is not None:
@@ -650,13 +951,7 @@ def convert_string_to_sympy_with_source(
 
             function_dict[function] = sympy.Function(function)
 
-    # Do the conversion
-    return evaluate_with_source(
-        expr,
-        locals_for_eval,
-        allow_complex=allow_complex,
-        simplify_expression=simplify_expression,
-    )
+    return locals_for_eval
 
 
 def point_to_error(expr: str, ind: int, w: int = 5) -> str:
@@ -679,7 +974,7 @@ def sympy_to_json(
     Returns:
         A JSON-serializable representation of the SymPy expression.
     """
-    const = _Constants()
+    const = _CONSTANTS
 
     # Get list of variables in the sympy expression
     variables = list(map(str, a.free_symbols))
@@ -877,6 +1172,141 @@ def validate_string_as_sympy(
     return None
 
 
+NUMERIC_CHECK_POINTS = 16
+"""The number of points at which [find_numeric_counterexample][prairielearn.sympy_utils.find_numeric_counterexample] compares expressions."""
+
+
+def _sample_symbol_values(
+    symbol: sympy.Symbol, rng: random.Random, num_points: int
+) -> list[sympy.Rational] | None:
+    """Pick random values that satisfy all assumptions about a symbol.
+
+    Returns:
+        The values, or `None` if not enough of the candidates satisfied the
+        assumptions (for example, because the symbol is irrational).
+    """
+    if symbol.is_positive or symbol.is_nonnegative:
+        low, high = 1, 192
+    elif symbol.is_negative or symbol.is_nonpositive:
+        low, high = -192, -1
+    else:
+        low, high = -192, 192
+    # Values are multiples of 1/64 between -3 and 3, or integers between -12
+    # and 12 for symbols that must be rational.
+    denominator = 16 if symbol.is_rational else 64
+
+    values: list[sympy.Rational] = []
+    for _ in range(4 * num_points):
+        numerator = rng.randint(low, high)
+        value = (
+            sympy.Integer(numerator // denominator)
+            if symbol.is_rational
+            else sympy.Rational(numerator, denominator)
+        )
+        # Rules out `nan` and `zoo`, which the denominator can't produce here.
+        if not isinstance(value, sympy.Rational):
+            continue
+        if all(
+            getattr(value, f"is_{fact}") == expected
+            for fact, expected in symbol.assumptions0.items()
+        ):
+            values.append(value)
+            if len(values) == num_points:
+                return values
+    return None
+
+
+def find_numeric_counterexample(
+    a: sympy.Expr, b: sympy.Expr, *, num_points: int = NUMERIC_CHECK_POINTS
+) -> dict[sympy.Symbol, sympy.Rational] | None:
+    """Look for values of the free symbols at which two expressions differ.
+
+    This is much faster than SymPy's `a.equals(b)` and is meant to run before
+    it, to reject expressions that are clearly different. Both expressions are
+    evaluated with NumPy at `num_points` random points that satisfy the
+    assumptions about each symbol. Points where they disagree are confirmed by
+    evaluating both expressions with 30 digits of precision, so rounding
+    errors in the first step can't produce a counterexample.
+
+    Agreement at every point doesn't prove that the expressions are equal.
+    No counterexample is found if the expressions contain custom functions
+    or functions that NumPy can't evaluate, or if no random values satisfy
+    the assumptions about a symbol.
+
+    Examples:
+        >>> x = sympy.Symbol("x")
+        >>> find_numeric_counterexample(sympy.sqrt(x**2), x)
+        {x: -43/16}
+        >>> find_numeric_counterexample((x + 1) ** 2, x**2 + 2 * x + 1) is None
+        True
+
+    Returns:
+        The values of the symbols at which the expressions differ, or `None` if no such values were found.
+    """
+    if a.atoms(AppliedUndef) or b.atoms(AppliedUndef):
+        return None
+
+    # Using the same points every time keeps grading deterministic.
+    rng = random.Random(0)
+    free_symbols = a.free_symbols | b.free_symbols
+    symbols = sorted(
+        (symbol for symbol in free_symbols if isinstance(symbol, sympy.Symbol)),
+        key=str,
+    )
+    if len(symbols) != len(free_symbols):
+        # Other free symbols, like indexed ones, can't be given random values.
+        return None
+    samples: list[list[sympy.Rational]] = []
+    for symbol in symbols:
+        values = _sample_symbol_values(symbol, rng, num_points)
+        if values is None:
+            return None
+        samples.append(values)
+
+    try:
+        evaluate = sympy.lambdify(symbols, [a, b], "numpy")
+        with np.errstate(all="ignore"):
+            a_values, b_values = (
+                np.broadcast_to(np.asarray(result, dtype=complex), (num_points,))
+                for result in evaluate(
+                    *(np.array(values, dtype=complex) for values in samples)
+                )
+            )
+    except Exception:
+        # The expressions use something NumPy can't evaluate, or their values
+        # don't fit in a float.
+        return None
+
+    with np.errstate(all="ignore"):
+        differ = (
+            np.isfinite(a_values)
+            & np.isfinite(b_values)
+            & (
+                np.abs(a_values - b_values)
+                > 1e-6 * np.maximum(np.abs(a_values), np.abs(b_values)) + 1e-12
+            )
+        )
+
+    for index in np.flatnonzero(differ)[:3]:
+        point = {
+            symbol: values[int(index)]
+            for symbol, values in zip(symbols, samples, strict=True)
+        }
+        subs: dict[sympy.Basic, sympy.Basic | float] = {**point}
+        try:
+            a_value = complex(a.evalf(30, subs=subs, strict=True))
+            b_value = complex(b.evalf(30, subs=subs, strict=True))
+        except Exception:
+            continue
+        if (
+            cmath.isfinite(a_value)
+            and cmath.isfinite(b_value)
+            and abs(a_value - b_value) > 1e-8 * max(abs(a_value), abs(b_value)) + 1e-12
+        ):
+            return point
+    return None
+
+
 def get_items_list(items_string: str | None) -> list[str]:
     """Return a list of items from a comma-separated string."""
     if items_string is None:
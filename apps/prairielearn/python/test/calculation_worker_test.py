@@ -0,0 +1,64 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+from prairielearn.internal.calculation_worker import CalculationWorker
+
+# Stands in for `calculation-worker.js`.
+FAKE_WORKER = """
+import json, os, sys
+
+print("starting", file=sys.stderr)
+for line in sys.stdin:
+    request = json.loads(line)
+    if request["func"] == "fail":
+        print("failing", file=sys.stderr)
+        sys.exit(1)
+    val = {"pid": os.getpid(), "func": request["func"]}
+    print(json.dumps({"val": val, "present": True}), flush=True)
+"""
+
+
+@pytest.fixture
+def worker(tmp_path: pathlib.Path) -> CalculationWorker:
+    return CalculationWorker(tmp_path, command=(sys.executable, "-c", FAKE_WORKER))
+
+
+def test_calls_reuse_process(worker: CalculationWorker, tmp_path: pathlib.Path) -> None:
+    responses = [json.loads(worker.call({"func": func})) for func in ("a", "b")]
+
+    assert [response["val"]["func"] for response in responses] == ["a", "b"]
+    assert responses[0]["val"]["pid"] == responses[1]["val"]["pid"] != os.getpid()
+    assert worker.is_usable(str(tmp_path))
+    assert not worker.is_usable(str(tmp_path / "other"))
+
+    worker.close()
+    assert worker.process.returncode == 0
+    assert not worker.is_usable(str(tmp_path))
+
+
+def test_call_failure(
+    worker: CalculationWorker,
+    tmp_path: pathlib.Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    with pytest.raises(subprocess.CalledProcessError):
+        worker.call({"func": "fail"})
+
+    assert worker.process.returncode == 1
+    assert not worker.is_usable(str(tmp_path))
+    assert capsys.readouterr().err == "starting\nfailing\n\n"
+
+
+def test_stderr_is_printed_after_each_call(
+    worker: CalculationWorker, capsys: pytest.CaptureFixture[str]
+) -> None:
+    # Output from starting the process comes with the first call.
+    worker.call({"func": "a"})
+    assert capsys.readouterr().err == "starting\n\n"
+    worker.call({"func": "b"})
+    assert capsys.readouterr().err == ""
+    worker.close()
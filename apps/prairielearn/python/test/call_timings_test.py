@@ -0,0 +1,34 @@
+import time
+
+import prairielearn.internal.call_timings as ct
+
+
+def test_nested_sections_are_exclusive() -> None:
+    timings = ct.CallTimings()
+    with timings.measure("traverse"):
+        with timings.measure("pl-number-input", element=True):
+            time.sleep(0.02)
+        with timings.measure("check_data"):
+            pass
+    with timings.measure("check_data"):
+        pass
+
+    result = timings.to_dict()
+    assert set(result["sections_ms"]) == {"traverse", "check_data"}
+    assert result["sections_ms"]["traverse"] < 20
+    assert result["elements_ms"]["pl-number-input"] >= 20
+    assert result["total_ms"] >= sum(result["sections_ms"].values()) + sum(
+        result["elements_ms"].values()
+    )
+    assert isinstance(result["rss_delta_bytes"], int)
+
+
+def test_measure_without_timings() -> None:
+    with ct.measure(None, "traverse"):
+        pass
+
+
+def test_memory_usage() -> None:
+    usage = ct.memory_usage()
+    assert usage["rss_bytes"] == usage["private_bytes"] + usage["shared_bytes"]
+    assert 0 < usage["private_bytes"] <= usage["pss_bytes"] <= usage["rss_bytes"]
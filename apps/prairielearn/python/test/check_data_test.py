@@ -1,7 +1,13 @@
 from typing import Any
 
 import pytest
-from prairielearn.internal.check_data import check_data
+from prairielearn.internal.check_data import (
+    check_data,
+    count_compared_values,
+    fingerprint_data,
+    same_fingerprint,
+    snapshot_data,
+)
 
 
 def test_check_data_extra_props() -> None:
@@ -67,3 +73,84 @@ def test_check_data_number_keys() -> None:
             {"panel": "question", 1: "data", 2: "more data"},
             "render",
         )
+
+
+def test_snapshot_data_only_copies_checked_props() -> None:
+    data = {
+        "params": {"big": list(range(100))},
+        "options": {"foo": "bar"},
+        "submitted_answers": {"x": 1},
+    }
+    snapshot = snapshot_data(data, "grade")
+
+    assert snapshot == data
+    # `params` can be edited during `grade`, so it isn't compared.
+    assert snapshot["params"] is data["params"]
+    assert snapshot["options"] is not data["options"]
+    assert snapshot["submitted_answers"] is data["submitted_answers"]
+
+    # `params` can't be edited during `test`.
+    assert snapshot_data(data, "test")["params"] is not data["params"]
+
+
+def test_snapshot_data_detects_nested_modification() -> None:
+    data = {"params": {"foo": {"bar": "baz"}}}
+    snapshot = snapshot_data(data, "test")
+    data["params"]["foo"]["bar"] = "qux"
+    with pytest.raises(
+        ValueError, match=r'data\["params"\] has been illegally modified'
+    ):
+        check_data(snapshot, data, "test")
+
+
+def test_check_data_without_comparing_values() -> None:
+    check_data(
+        {"params": {"foo": "bar"}},
+        {"params": {"foo": "baz"}},
+        "test",
+        compare_values=False,
+    )
+    with pytest.raises(ValueError, match=r'Expected data\["params"\] to be an object'):
+        check_data({"params": {}}, {"params": []}, "test", compare_values=False)
+
+
+def test_fingerprint_data() -> None:
+    data: dict[str, Any] = {
+        "params": {"foo": {"bar": "baz"}, "list": [1]},
+        "raw_submitted_answers": {"x": "1"},
+        "variant_seed": 1,
+    }
+    fingerprint = fingerprint_data(data, "test")
+    assert same_fingerprint(fingerprint, fingerprint_data(data, "test"))
+
+    # Changes to props that can be edited don't matter.
+    data["raw_submitted_answers"]["x"] = "2"
+    assert same_fingerprint(fingerprint, fingerprint_data(data, "test"))
+
+    # Neither do changes nested more deeply than the direct children.
+    data["params"]["foo"]["bar"] = "qux"
+    data["params"]["list"].append(2)
+    assert same_fingerprint(fingerprint, fingerprint_data(data, "test"))
+
+    data["params"]["foo"] = {"bar": "qux"}
+    assert not same_fingerprint(fingerprint, fingerprint_data(data, "test"))
+    fingerprint = fingerprint_data(data, "test")
+    data["params"]["new"] = 1
+    assert not same_fingerprint(fingerprint, fingerprint_data(data, "test"))
+    fingerprint = fingerprint_data(data, "test")
+    data["variant_seed"] = 2
+    assert not same_fingerprint(fingerprint, fingerprint_data(data, "test"))
+
+
+def test_count_compared_values() -> None:
+    data: dict[str, Any] = {
+        "params": {"matrix": [[1, 2], [3, 4]], "x": 1},
+        "raw_submitted_answers": {"x": "1"},
+        "variant_seed": 1,
+    }
+    # `params`, `matrix`, its two rows, their four values, `x`, and `variant_seed`.
+    assert count_compared_values(data, "test", 100) == 10
+    # `raw_submitted_answers`, its value, and `variant_seed`, since `params`
+    # can be edited during `grade`.
+    assert count_compared_values(data, "grade", 100) == 3
+    assert count_compared_values(data, "test", 3) > 3
@@ -0,0 +1,84 @@
+import pathlib
+from collections.abc import Iterator
+
+import prairielearn.internal.code_cache as cc
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def reset_cache() -> Iterator[None]:
+    yield
+    cc._memory_cache.clear()
+    cc.set_disk_cache_dir(None)
+
+
+def test_compile_file_reuses_code(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "server.py"
+    path.write_text("x = 1\n")
+
+    code = cc.compile_file(path)
+    assert code.co_filename == str(path)
+    assert cc.compile_file(path) is code
+
+
+def test_compile_file_detects_changes(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "server.py"
+    path.write_text("x = 1\n")
+    cc.compile_file(path)
+
+    path.write_text("x = 22\n")
+    mod: dict[str, object] = {}
+    exec(cc.compile_file(path), mod)
+    assert mod["x"] == 22
+
+
+def test_disk_cache_survives_memory_cache(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache_dir = tmp_path / "cache"
+    cc.set_disk_cache_dir(cache_dir)
+    path = tmp_path / "server.py"
+    path.write_text("x = 1\n")
+
+    cc.compile_file(path)
+    (cache_file,) = cache_dir.iterdir()
+
+    # Simulate a fresh worker; the code should come from disk.
+    cc._memory_cache.clear()
+    with monkeypatch.context() as m:
+        m.setattr(cc, "compile", None, raising=False)
+        assert cc.compile_file(path).co_filename == str(path)
+    assert list(cache_dir.iterdir()) == [cache_file]
+
+    # Changing the source must not reuse the old entry.
+    path.write_text("x = 2\n")
+    mod: dict[str, object] = {}
+    exec(cc.compile_file(path), mod)
+    assert mod["x"] == 2
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+def test_corrupt_disk_cache_is_ignored(tmp_path: pathlib.Path) -> None:
+    cache_dir = tmp_path / "cache"
+    cc.set_disk_cache_dir(cache_dir)
+    path = tmp_path / "server.py"
+    path.write_text("x = 1\n")
+    cc.compile_file(path)
+    (cache_file,) = cache_dir.iterdir()
+    cache_file.write_bytes(b"not marshal data")
+
+    cc._memory_cache.clear()
+    mod: dict[str, object] = {}
+    exec(cc.compile_file(path), mod)
+    assert mod["x"] == 1
+
+
+def test_precompile_elements(tmp_path: pathlib.Path) -> None:
+    for name, controller in [("pl-a", "pl-a.py"), ("pl-b", "pl-b.py")]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "info.json").write_text(f'{{"controller": "{controller}"}}')
+    (tmp_path / "pl-a" / "pl-a.py").write_text("x = 1\n")
+    (tmp_path / "pl-b" / "pl-b.py").write_text("def broken(:\n")
+
+    assert cc.precompile_elements(tmp_path) == 1
+    assert str(tmp_path / "pl-a" / "pl-a.py") in cc._memory_cache
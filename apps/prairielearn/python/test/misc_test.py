@@ -12,9 +12,11 @@ import lxml.html
 import networkx as nx
 import numpy as np
 import pandas as pd
+import pint
 import prairielearn as pl
 import pytest
 from numpy.typing import ArrayLike
+from prairielearn import misc_utils
 
 
 def city_dataframe() -> pd.DataFrame:
@@ -1318,3 +1320,44 @@ def test_partition() -> None:
     evens, odds = pl.partition(nums, lambda x: x % 2 == 0)
     assert odds == [1, 3, 5]
     assert evens == [2, 4, 6]
+
+
+def test_get_unit_registry_is_shared() -> None:
+    ureg = pl.get_unit_registry()
+    assert pl.get_unit_registry() is ureg
+    assert ureg.Quantity("1 m") == ureg.Quantity("100 cm")
+
+
+def test_parse_quantity() -> None:
+    ureg = pl.get_unit_registry()
+    quantity = pl.parse_quantity("9.81 m/s^2")
+    assert quantity == ureg.Quantity("9.81 m/s^2")
+    # Modifying a parsed quantity doesn't affect the next one.
+    quantity *= 2
+    assert pl.parse_quantity("9.81 m/s^2").magnitude == 9.81
+    assert (quantity * ureg.s).units == ureg.Quantity("1 m/s").units
+
+    with pytest.raises(pint.errors.UndefinedUnitError):
+        pl.parse_quantity("3 blorps")
+
+
+def test_parse_quantity_follows_registry_changes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Use a registry of our own, since defined units can't be removed.
+    monkeypatch.setattr(misc_utils, "_unit_registry", None)
+    ureg = pl.get_unit_registry()
+
+    # Until `fts` is defined, it's the plural of `ft`.
+    assert pl.parse_quantity("1 fts") == ureg.Quantity("1 ft")
+    ureg.define("fts = 7 m")
+    assert pl.parse_quantity("1 fts").to("m").magnitude == 7
+
+    ureg.preprocessors.append(lambda quantity: quantity.replace("blorp", "m"))
+    assert pl.parse_quantity("3 blorp") == ureg.Quantity("3 m")
+
+    # Settings that change how quantities are parsed are part of the cache key.
+    assert pl.parse_quantity("100 cm*m/m").units == ureg.cm
+    ureg.auto_reduce_dimensions = True
+    assert pl.parse_quantity("100 cm*m/m") == ureg.Quantity("1 m")
+    assert pl.parse_quantity("100 cm*m/m").units == ureg.m
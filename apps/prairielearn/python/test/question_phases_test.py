@@ -0,0 +1,400 @@
+import copy
+import json
+import os
+import pathlib
+import pickle
+import random
+import sys
+from collections.abc import Iterator
+from typing import Any
+
+import lxml.html
+import numpy as np
+import pytest
+from prairielearn.internal import question_phases
+
+
+@pytest.fixture(autouse=True)
+def reset_mod_cache() -> Iterator[None]:
+    yield
+    question_phases.mod_cache.clear()
+    question_phases.preloaded_code.clear()
+
+
+def test_find_core_element_controllers() -> None:
+    controllers = question_phases.find_core_element_controllers()
+    assert controllers["pl-order-blocks"] == (
+        question_phases.CORE_ELEMENTS_PATH / "pl-order-blocks" / "pl-order-blocks.py"
+    )
+
+
+def test_preload_core_elements(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Other tests may already have imported the element's helper modules.
+    monkeypatch.delitem(sys.modules, "dag_checker", raising=False)
+    controllers = question_phases.find_core_element_controllers()
+    preloaded = question_phases.preload_core_elements({
+        "pl-order-blocks": controllers["pl-order-blocks"]
+    })
+
+    assert preloaded == ["pl-order-blocks"]
+    mod = question_phases.mod_cache[controllers["pl-order-blocks"]]
+    assert callable(mod["render"])
+    # Modules from the element directory stay referenced by the controller,
+    # but mustn't shadow question modules with the same name.
+    assert mod["grade_dag"].__module__ == "dag_checker"
+    assert "dag_checker" not in sys.modules
+
+
+def test_preload_skips_broken_controllers(tmp_path: pathlib.Path) -> None:
+    missing = tmp_path / "pl-missing.py"
+    assert question_phases.preload_core_elements({"pl-missing": missing}) == []
+    assert question_phases.mod_cache == {}
+
+
+PID_ELEMENT = """
+import os
+from prairielearn.html_utils import FinalHtml
+
+def render(element_html, data):
+    if b"fail" in element_html:
+        raise ValueError("failed")
+    html = f"<i>{os.getpid()}</i>"
+    return FinalHtml(html) if b"final" in element_html else html
+"""
+
+
+def render_pid_elements(
+    tmp_path: pathlib.Path, html: str, render_processes: int
+) -> tuple[list[int], set[str]]:
+    elements: dict[str, question_phases.ElementInfo] = {}
+    for name, pure in (("pl-pure", True), ("pl-impure", False)):
+        (tmp_path / "elements" / name).mkdir(parents=True, exist_ok=True)
+        (tmp_path / "elements" / name / f"{name}.py").write_text(PID_ELEMENT)
+        elements[name] = {
+            "name": name,
+            "controller": f"{name}.py",
+            "type": "course",
+            "renderPure": pure,
+        }
+    context: question_phases.RenderContext = {
+        "html": html,
+        "elements": elements,
+        "element_extensions": {},
+        "course_path": str(tmp_path),
+    }
+    data = {
+        "options": {
+            "course_element_files_url": "/elements",
+            "course_element_extension_files_url": "/extensions",
+        }
+    }
+    result, processed_elements = question_phases.process(
+        "render", data, context, render_processes=render_processes
+    )
+    assert result is not None
+    return [int(pid) for pid in lxml.html.fromstring(result).xpath("//i/text()")], (
+        processed_elements
+    )
+
+
+def test_render_in_subprocesses(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    pids, processed_elements = render_pid_elements(
+        tmp_path,
+        "<div><pl-pure></pl-pure><pl-impure></pl-impure></div>"
+        "<pl-pure final></pl-pure><pl-pure></pl-pure>",
+        render_processes=2,
+    )
+
+    assert processed_elements == {"pl-pure", "pl-impure"}
+    assert pids[1] == os.getpid()
+    # The pure elements are rendered in two other processes, round-robin.
+    assert os.getpid() not in {pids[0], pids[2], pids[3]}
+    assert pids[0] == pids[3] != pids[2]
+
+
+def test_render_in_subprocesses_disabled(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    pids, _ = render_pid_elements(
+        tmp_path, "<pl-pure></pl-pure><pl-pure></pl-pure>", render_processes=0
+    )
+    assert pids == [os.getpid(), os.getpid()]
+
+
+def test_render_in_subprocesses_failure(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    # The failing element is rendered again in this process, which raises.
+    with pytest.raises(RuntimeError) as exc_info:
+        render_pid_elements(
+            tmp_path, "<pl-pure></pl-pure><pl-pure fail></pl-pure>", render_processes=2
+        )
+    assert isinstance(exc_info.value.__cause__, ValueError)
+
+
+def test_render_in_subprocesses_seeds_and_output(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    elements = [lxml.html.fragment_fromstring(f"<p>{i}</p>") for i in range(4)]
+
+    def render(element: lxml.html.HtmlElement) -> str:
+        print(f"rendering {element.text}")
+        return f"{random.random()} {np.random.random()}"
+
+    def run() -> tuple[list[str], float]:
+        random.seed(1)
+        np.random.seed(1)
+        rendered = question_phases.render_in_subprocesses(elements, render, 2)
+        return [rendered[e] for e in elements], random.random()
+
+    values, after = run()
+    # The children don't share a sequence of random numbers with each other,
+    # but the results, and what's left of this process's sequence, don't
+    # change from one run to the next.
+    assert len({v for value in values for v in value.split()}) == 8
+    assert run() == (values, after)
+
+    out = capsys.readouterr().out.splitlines()
+    assert sorted(out) == sorted([f"rendering {i}" for i in range(4)] * 2)
+
+
+def run_test_phase(
+    tmp_path: pathlib.Path, html: str, controllers: dict[str, str]
+) -> dict[str, Any]:
+    elements: dict[str, question_phases.ElementInfo] = {}
+    for name, source in controllers.items():
+        (tmp_path / "elements" / name).mkdir(parents=True, exist_ok=True)
+        (tmp_path / "elements" / name / f"{name}.py").write_text(source)
+        elements[name] = {"name": name, "controller": f"{name}.py", "type": "course"}
+    context: question_phases.RenderContext = {
+        "html": html,
+        "elements": elements,
+        "element_extensions": {},
+        "course_path": str(tmp_path),
+    }
+    data = {
+        "params": {"matrix": [[1, 2], [3, 4]], "x": 1},
+        "correct_answers": {"x": 1},
+        "variant_seed": 1,
+        "options": {},
+        "format_errors": {},
+        "raw_submitted_answers": {},
+        "partial_scores": {},
+        "score": 0,
+        "feedback": {},
+        "gradable": True,
+        "test_type": "correct",
+    }
+    question_phases.process("test", data, context)
+    return data
+
+
+READ_ONLY_ELEMENT = """
+def test(element_html, data):
+    data["raw_submitted_answers"]["x"] = str(data["correct_answers"]["x"])
+"""
+
+
+def test_process_checks_data(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    data = run_test_phase(
+        tmp_path,
+        "<pl-read></pl-read><pl-read></pl-read>",
+        {"pl-read": READ_ONLY_ELEMENT},
+    )
+    assert data["raw_submitted_answers"] == {"x": "1"}
+
+
+@pytest.mark.parametrize("defer_compare", [False, True])
+@pytest.mark.parametrize(
+    "modification", ['data["params"]["x"] = 2', 'data["params"]["matrix"][0][0] = 5']
+)
+def test_process_detects_illegal_modification(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    modification: str,
+    *,
+    defer_compare: bool,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    if defer_compare:
+        monkeypatch.setattr(question_phases, "COMPARE_EACH_ELEMENT_LIMIT", 0)
+    with pytest.raises(
+        RuntimeError, match=r"^Error processing element pl-modify$"
+    ) as exc_info:
+        run_test_phase(
+            tmp_path,
+            "<pl-read></pl-read><pl-modify></pl-modify><pl-read></pl-read>",
+            {
+                "pl-read": READ_ONLY_ELEMENT,
+                "pl-modify": f"def test(element_html, data):\n    {modification}\n",
+            },
+        )
+    assert str(exc_info.value.__cause__) == 'data["params"] has been illegally modified'
+
+
+@pytest.mark.parametrize("defer_compare", [False, True])
+def test_process_blames_element_with_deep_modification(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, *, defer_compare: bool
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    if defer_compare:
+        monkeypatch.setattr(question_phases, "COMPARE_EACH_ELEMENT_LIMIT", 0)
+    # `pl-deep` makes a change that the fingerprint misses before `pl-shallow`
+    # makes one that it sees.
+    with pytest.raises(
+        RuntimeError, match=r"^Error processing element pl-deep$"
+    ) as exc_info:
+        run_test_phase(
+            tmp_path,
+            "<pl-read></pl-read><pl-deep></pl-deep><pl-shallow></pl-shallow>",
+            {
+                "pl-read": READ_ONLY_ELEMENT,
+                "pl-deep": (
+                    "import random\n"
+                    "def test(element_html, data):\n"
+                    "    data['params']['matrix'][0][0] = random.random()\n"
+                ),
+                "pl-shallow": "def test(element_html, data):\n    data['params']['x'] = 2\n",
+            },
+        )
+    assert str(exc_info.value.__cause__) == 'data["params"] has been illegally modified'
+
+
+def test_process_discards_replay_output(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(question_phases, "COMPARE_EACH_ELEMENT_LIMIT", 0)
+    # The elements run again to find the one that made the change, but what
+    # they print is only printed once.
+    with pytest.raises(RuntimeError, match=r"^Error processing element pl-deep$"):
+        run_test_phase(
+            tmp_path,
+            "<pl-print></pl-print><pl-deep></pl-deep><pl-print></pl-print>",
+            {
+                "pl-print": "def test(element_html, data):\n    print('hello')\n",
+                "pl-deep": "def test(element_html, data):\n    data['params']['matrix'][0][0] = 5\n",
+            },
+        )
+    assert capsys.readouterr().out == "hello\nhello\n"
+
+
+def test_process_reports_unreproduced_modification(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(question_phases, "COMPARE_EACH_ELEMENT_LIMIT", 0)
+    # The modification isn't made again when the elements are run again to
+    # find the one that made it.
+    with pytest.raises(
+        RuntimeError, match=r"^Error processing one of the elements pl-read, pl-once$"
+    ):
+        run_test_phase(
+            tmp_path,
+            "<pl-read></pl-read><pl-once></pl-once>",
+            {
+                "pl-read": READ_ONLY_ELEMENT,
+                "pl-once": (
+                    "calls = []\n"
+                    "def test(element_html, data):\n"
+                    "    if not calls:\n"
+                    "        data['params']['matrix'][0][0] = 5\n"
+                    "    calls.append(None)\n"
+                ),
+            },
+        )
+
+
+def test_process_detects_undone_modification(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(RuntimeError, match=r"^Error processing element pl-modify$"):
+        run_test_phase(
+            tmp_path,
+            "<pl-modify></pl-modify><pl-undo></pl-undo>",
+            {
+                "pl-modify": "def test(element_html, data):\n    data['params']['matrix'][0][0] = 5\n",
+                "pl-undo": "def test(element_html, data):\n    data['params']['matrix'][0][0] = 1\n",
+            },
+        )
+
+
+def test_read_only() -> None:
+    value = question_phases.read_only({"a": [1, {"b": 2}], "c": "d"})
+    assert value == {"a": [1, {"b": 2}], "c": "d"}
+    assert json.dumps(value) == '{"a": [1, {"b": 2}], "c": "d"}'
+    with pytest.raises(TypeError):
+        value["c"] = "e"
+    with pytest.raises(TypeError):
+        value["a"][1].update(b=3)
+    with pytest.raises(TypeError):
+        value["a"].append(3)
+
+    for value_copy in (
+        copy.copy(value),
+        copy.deepcopy(value),
+        pickle.loads(pickle.dumps(value)),
+    ):
+        assert type(value_copy) is dict
+        assert value_copy == value
+        value_copy["c"] = "e"
+    assert type(copy.deepcopy(value)["a"][1]) is dict
+
+
+def test_prepare_data_is_shared(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "elements" / "pl-ext").mkdir(parents=True)
+    (tmp_path / "elements" / "pl-ext" / "pl-ext.py").write_text(
+        "seen = []\n"
+        "def render(element_html, data):\n"
+        "    options = data['options']\n"
+        "    seen.append((\n"
+        "        data['extensions'],\n"
+        "        options['client_files_element_url'],\n"
+        "        options['client_files_extensions_url'],\n"
+        "    ))\n"
+        "    return ''\n"
+    )
+    context: question_phases.RenderContext = {
+        "html": "<pl-ext></pl-ext><pl-ext></pl-ext>",
+        "elements": {
+            "pl-ext": {"name": "pl-ext", "controller": "pl-ext.py", "type": "course"}
+        },
+        "element_extensions": {"pl-ext": {"ext": {"name": "ext", "directory": "d"}}},
+        "course_path": str(tmp_path),
+    }
+    data = {
+        "options": {
+            "course_element_files_url": "/elements",
+            "course_element_extension_files_url": "/extensions",
+        }
+    }
+    question_phases.process("render", data, context)
+
+    controller = tmp_path / "elements" / "pl-ext" / "pl-ext.py"
+    seen = question_phases.mod_cache[controller]["seen"]
+    (extensions, element_url, extensions_url), other = seen
+    assert other == seen[0]
+    assert extensions is other[0]
+    assert extensions == {"ext": {"name": "ext", "directory": "d"}}
+    assert element_url == "/elements/pl-ext/clientFilesElement"
+    assert extensions_url == {"ext": "/extensions/pl-ext/ext/clientFilesExtension"}
+    # The element's extensions aren't shared with the context.
+    with pytest.raises(TypeError):
+        extensions["ext"]["name"] = "other"
+    assert context["element_extensions"]["pl-ext"]["ext"]["name"] == "ext"
+    assert "extensions" not in data
+    assert "client_files_element_url" not in data["options"]
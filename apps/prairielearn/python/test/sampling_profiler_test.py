@@ -0,0 +1,45 @@
+import signal
+import time
+
+from prairielearn.internal.sampling_profiler import SamplingProfiler
+
+
+def busy_loop(seconds: float) -> str:
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+    return "done"
+
+
+def test_run_collects_samples() -> None:
+    previous_handler = signal.getsignal(signal.SIGPROF)
+    profiler = SamplingProfiler()
+
+    assert profiler.run(busy_loop, 0.2) == "done"
+
+    assert signal.getsignal(signal.SIGPROF) == previous_handler
+    assert profiler.counts.total() > 0
+    assert profiler.cpu_time >= 0.2
+    stacks, truncated = profiler.collapsed_stacks()
+    assert not truncated
+    for line in stacks.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        # Only frames from inside the profiled call are included.
+        assert stack.startswith("busy_loop (")
+        assert int(count) > 0
+
+
+def test_collapsed_stacks_are_capped() -> None:
+    profiler = SamplingProfiler()
+    codes = [compile(f"x{i} = 1", f"file{i}.py", "exec") for i in range(5)]
+    profiler.counts[tuple(codes)] = 3
+    for code in codes:
+        profiler.counts[code,] = 1
+
+    stacks, truncated = profiler.collapsed_stacks(max_depth=2, max_stacks=3)
+    lines = stacks.splitlines()
+
+    assert truncated
+    assert lines[0] == "<module> (file0.py:1);<module> (file1.py:1);[truncated] 3"
+    assert len(lines) == 4
+    assert lines[-1] == "[truncated] 3"
@@ -32,6 +32,152 @@ def test_evaluate() -> None:
         psu.evaluate("eval('dict')", locals_for_eval=locals_for_eval)
 
 
+class UnhashableFunction:
+    __hash__ = None  # pyright: ignore[reportAssignmentType]
+
+    def __call__(self, x: sympy.Expr) -> sympy.Expr:
+        return 2 * x
+
+
+def test_evaluate_unhashable_locals() -> None:
+    """Locals that can't be part of a cache key are still usable, just not cached."""
+    psu.clear_parse_caches()
+    z = sympy.Symbol("z")
+    locals_for_eval: psu.LocalsForEval = {
+        "functions": {"double": UnhashableFunction()},
+        "variables": {str(z): z},
+        "helpers": {},
+    }
+    for _ in range(2):
+        assert psu.evaluate("double(z) + 1", locals_for_eval=locals_for_eval) == (
+            2 * z + 1
+        )
+    assert psu.parse_cache_stats()["stringify"]["entries"] == 0
+
+
+def test_names_are_not_shared_between_calls() -> None:
+    """Variables and functions from one call aren't available in the next one."""
+    x = sympy.Symbol("x")
+    f = sympy.Function("f")
+    assert psu.convert_string_to_sympy("f(x)", ["x"], custom_functions=["f"]) == f(x)
+    assert psu.convert_string_to_sympy("x", ["x"], allow_trig_functions=False) == x
+
+    # Without the variable or custom function, `x` and `f` are parsed as
+    # symbols, which aren't allowed.
+    with pytest.raises(psu.HasInvalidSymbolError):
+        psu.convert_string_to_sympy("x")
+    with pytest.raises(psu.HasInvalidSymbolError):
+        psu.convert_string_to_sympy("f(1)")
+    with pytest.raises(psu.HasInvalidFunctionError):
+        psu.convert_string_to_sympy("sin(1)", allow_trig_functions=False)
+    assert psu.convert_string_to_sympy("sin(1)") == sympy.sin(1)
+
+
+def test_parse_caches() -> None:
+    psu.clear_parse_caches()
+    n = sympy.Symbol("n", positive=True)
+    for _ in range(3):
+        assert psu.convert_string_to_sympy(
+            "n^2 + 1", ("n",), assumptions={"n": {"positive": True}}
+        ) == (n**2 + 1)
+    assert psu.parse_cache_stats()["conversions"] == {
+        "entries": 1,
+        "hits": 2,
+        "misses": 1,
+    }
+
+    # Different options are cached separately.
+    assert psu.convert_string_to_sympy("n^2 + 1", ["n"]) == sympy.Symbol("n") ** 2 + 1
+    assert psu.parse_cache_stats()["conversions"]["misses"] == 2
+    # Generating and checking the code doesn't depend on assumptions.
+    assert psu.parse_cache_stats()["stringify"]["entries"] == 2
+    assert psu.parse_cache_stats()["ast_check"] == {
+        "entries": 1,
+        "hits": 1,
+        "misses": 1,
+    }
+
+    # Invalid input raises every time.
+    for _ in range(2):
+        with pytest.raises(psu.HasInvalidSymbolError):
+            psu.convert_string_to_sympy("n^2 + 1")
+    assert psu.parse_cache_stats()["conversions"]["misses"] == 4
+
+    psu.clear_parse_caches()
+    assert psu.parse_cache_stats()["conversions"] == {
+        "entries": 0,
+        "hits": 0,
+        "misses": 0,
+    }
+
+
+def test_convert_strings_to_sympy() -> None:
+    psu.clear_parse_caches()
+    x = sympy.Symbol("x", positive=True)
+    exprs = ["x", "0", "x^2 + 1", "0", "x"]
+    assert psu.convert_strings_to_sympy(
+        exprs, ["x"], assumptions={"x": {"positive": True}}
+    ) == [x, 0, x**2 + 1, 0, x]
+    assert psu.parse_cache_stats()["conversions"]["misses"] == 3
+
+    # The results are shared with single conversions.
+    assert psu.convert_string_to_sympy(
+        "x^2 + 1", ["x"], assumptions={"x": {"positive": True}}
+    ) == (x**2 + 1)
+    assert psu.parse_cache_stats()["conversions"]["hits"] == 1
+
+    with pytest.raises(psu.HasInvalidSymbolError):
+        psu.convert_strings_to_sympy(["1", "y"], ["x"])
+    assert psu.convert_strings_to_sympy([], ["x"]) == []
+
+
+X = sympy.Symbol("x")
+Y = sympy.Symbol("y")
+P = sympy.Symbol("p", positive=True)
+K = sympy.Symbol("k", integer=True)
+
+
+@pytest.mark.parametrize(
+    ("a", "b"),
+    [
+        (sympy.sqrt(X**2), X),
+        (X**3, X**2),
+        (sympy.log(X * Y), sympy.log(X) + sympy.log(Y)),
+        (sympy.atan(X) + sympy.atan(1 / X), sympy.pi / 2),
+        # Only differs by 1 where the expanded form cancels catastrophically.
+        ((X - 1) ** 30, sympy.expand((X - 1) ** 30) + 1),
+        (sympy.Integer(2) ** 80 * X, X),
+    ],
+)
+def test_find_numeric_counterexample(a: sympy.Expr, b: sympy.Expr) -> None:
+    point = psu.find_numeric_counterexample(a, b)
+    assert point is not None
+    assert set(point) == a.free_symbols | b.free_symbols
+    assert a.subs(point) != b.subs(point)
+
+
+@pytest.mark.parametrize(
+    ("a", "b"),
+    [
+        ((X + 1) ** 2, X**2 + 2 * X + 1),
+        (sympy.sin(X) ** 2 + sympy.cos(X) ** 2, sympy.Integer(1)),
+        (sympy.exp(X) * sympy.exp(Y), sympy.exp(X + Y)),
+        ((X - 1) ** 30, sympy.expand((X - 1) ** 30)),
+        # Only equal given the assumptions.
+        (sympy.sqrt(P**2), P),
+        (sympy.log(P**2), 2 * sympy.log(P)),
+        (sympy.sin(sympy.pi * K), sympy.Integer(0)),
+        # Can't be evaluated numerically.
+        (sympy.Function("f")(X), X),
+        (sympy.Symbol("z", irrational=True), sympy.Integer(0)),
+        # Can't be given random values.
+        (sympy.IndexedBase("A")[1], 2 * sympy.IndexedBase("A")[1]),
+    ],
+)
+def test_find_numeric_counterexample_none(a: sympy.Expr, b: sympy.Expr) -> None:
+    assert psu.find_numeric_counterexample(a, b) is None
+
+
 class TestSympy:
     SYMBOL_NAMES = ("n", "m", "alpha", "\u03bc0")
     M, N, ALPHA, MU0 = sympy.symbols("m n alpha mu0")
@@ -291,6 +437,14 @@ class TestSympy:
         # Check equivalence after converting back
         assert matrix == pl.from_json(pl.to_json(matrix))
 
+    def test_matrix_conversion_repeated_cells(self) -> None:
+        matrix = sympy.Matrix([[self.M * self.N, 0], [0, self.M * self.N]])
+        value = pl.to_json(matrix)
+        assert value["_value"] == [["m*n", "0"], ["0", "m*n"]]
+        psu.clear_parse_caches()
+        assert pl.from_json(value) == matrix
+        assert psu.parse_cache_stats()["conversions"]["entries"] == 2
+
     @pytest.mark.parametrize(
         ("expr", "bad_assumptions"),
         [
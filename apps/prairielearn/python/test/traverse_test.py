@@ -1,10 +1,19 @@
+from collections import OrderedDict
 from typing import TYPE_CHECKING
 
 import lxml.html
+import pytest
+from prairielearn.html_utils import FinalHtml
+from prairielearn.internal import traverse
 from prairielearn.internal.traverse import (
     ElementReplacement,
+    copy_fragments,
+    find_elements,
+    parse_fragments,
+    prepare_text,
     traverse_and_execute,
     traverse_and_replace,
+    traverse_and_write,
 )
 
 if TYPE_CHECKING:
@@ -26,6 +35,76 @@ def test_traverse_and_execute() -> None:
     assert tags == ["p", "i", "strong"]
 
 
+def test_traverse_and_execute_with_tags() -> None:
+    tags: list[str | bytearray | bytes | QName] = []
+
+    traverse_and_execute(
+        "<p><pl-a>1<pl-b>2</pl-b></pl-a><i><pl-b>3</pl-b></i></p><pl-a>4</pl-a>",
+        lambda e: tags.append(f"{e.tag} {e.text_content()}"),
+        tags=["pl-a", "pl-b", "pl-c"],
+    )
+
+    assert tags == ["pl-a 12", "pl-b 2", "pl-b 3", "pl-a 4"]
+
+
+def test_find_elements() -> None:
+    html = "Hello <pl-a><pl-b></pl-b></pl-a><!-- pl-a --><pl-b></pl-b>"
+    elements = find_elements(html, {"pl-a", "pl-b"})
+
+    assert [e.tag for e in elements] == ["pl-a", "pl-b", "pl-b"]
+    assert find_elements(html, ["pl-b", "pl-a"]) is elements
+    assert [e.tag for e in find_elements(html, ["pl-b"])] == ["pl-b", "pl-b"]
+    assert find_elements(html, []) == []
+
+
+def test_parse_fragments_is_cached() -> None:
+    html = "Hello <p>world<i>!</i></p> <b>again</b>"
+    fragments = parse_fragments(html)
+
+    assert parse_fragments(html) is fragments
+    assert fragments[0] == "Hello "
+    assert [lxml.html.tostring(f, encoding="unicode") for f in fragments[1:]] == [
+        "<p>world<i>!</i></p> ",
+        "<b>again</b>",
+    ]
+
+
+def test_parse_fragments_evicts_least_recently_used(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(traverse, "_fragment_cache", OrderedDict())
+    monkeypatch.setattr(traverse, "FRAGMENT_CACHE_SIZE", 2)
+    first = parse_fragments("<p>1</p>")
+    second = parse_fragments("<p>2</p>")
+    assert parse_fragments("<p>1</p>") is first
+    parse_fragments("<p>3</p>")
+
+    assert parse_fragments("<p>1</p>") is first
+    assert parse_fragments("<p>2</p>") is not second
+
+
+def test_copy_fragments() -> None:
+    fragments = parse_fragments("Hello <p>world<i>!</i></p> <b>again</b>")
+    copied = copy_fragments(fragments)
+
+    assert copied[0] == "Hello "
+    assert [lxml.html.tostring(f) for f in copied[1:]] == [
+        lxml.html.tostring(f) for f in fragments[1:]
+    ]
+    assert all(c is not f for c, f in zip(copied[1:], fragments[1:], strict=True))
+    assert copy_fragments(parse_fragments("Hello")) == ["Hello"]
+
+
+def test_traverse_and_replace_does_not_modify_cached_fragments() -> None:
+    def replace(e: lxml.html.HtmlElement) -> ElementReplacement:
+        e.tail = None
+        return e
+
+    html = "<p>Hello</p> world"
+    assert traverse_and_replace(html, replace) == "<p>Hello</p>"
+    assert traverse_and_replace(html, lambda e: e) == "<p>Hello</p> world"
+
+
 def test_traverse_and_replace_text() -> None:
     html = traverse_and_replace("Hello", lambda _: "Goodbye")
     assert html == "Hello"
@@ -418,3 +497,46 @@ def test_traverse_and_replace_empty_multiple_levels() -> None:
         replace,
     )
     assert html == "<table><tbody><tr><td></td></tr></tbody>\n</table>"
+
+
+def test_traverse_and_replace_final_html() -> None:
+    def replace(e: lxml.html.HtmlElement) -> ElementReplacement:
+        if e.tag == "pl-a":
+            # Neither parsed nor traversed again.
+            return FinalHtml("<p class=x>1 &lt; 2<pl-b></pl-b>")
+        if e.tag == "pl-b":
+            return "<p>b</p>"
+        return e
+
+    html = traverse_and_replace(
+        "<div><pl-a></pl-a> a &lt; b<pl-b></pl-b></div>",
+        replace,
+    )
+    assert html == "<div><p class=x>1 &lt; 2<pl-b></pl-b> a &lt; b<p>b</p></div>"
+
+
+def test_traverse_and_replace_final_html_trailing_entity() -> None:
+    def replace(e: lxml.html.HtmlElement) -> ElementReplacement:
+        if e.tag == "pl-a":
+            return FinalHtml("<b>a</b>")
+        if e.tag == "pl-b":
+            return "<b>b</b>"
+        return e
+
+    # The tail is escaped the same way whether or not the replacement is final.
+    html = traverse_and_replace(
+        "<pl-a></pl-a> &lt;i&gt; &amp;<pl-b></pl-b> &lt;i&gt; &amp;", replace
+    )
+    assert html == "<b>a</b> &lt;i&gt; &amp;<b>b</b> &lt;i&gt; &amp;"
+
+
+def test_traverse_and_write() -> None:
+    written: list[str] = []
+    traverse_and_write("<p>Hello <i>world</i>!</p>", lambda e: e, written.append)
+    assert written == ["<p>", "Hello ", "<i>", "world", "</i>", "!", "</p>"]
+
+
+def test_prepare_text() -> None:
+    assert prepare_text("\n  ") == "\n  "
+    assert prepare_text("1 < 2 \"'") == "1 &lt; 2 &quot;&#x27;"
+    assert prepare_text("&langle;1 &amp;&lt; 2") == "⟨1 &amp;&lt; 2"
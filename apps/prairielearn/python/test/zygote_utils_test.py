@@ -56,3 +56,50 @@ def test_all_integers_within_limits_no_exception(item: Any) -> None:
 def test_all_integers_within_limits_raise_exception(item: Any) -> None:
     with pytest.raises(ValueError, match="oversized integer"):
         zu.assert_all_integers_within_limits(item)
+
+
+@pytest.mark.parametrize(
+    "item",
+    [
+        [1, -900719925474099, 1.5, "text"],
+        # The digits after the decimal point or in a string aren't an integer.
+        [0.8444218515250481, 1e16, "a9007199254740992"],
+    ],
+)
+def test_may_contain_oversized_integer_false(item: Any) -> None:
+    json_str = json.dumps(item)
+    assert not zu.may_contain_oversized_integer(json_str)
+    assert not zu.may_contain_oversized_integer(json_str.encode())
+
+
+@pytest.mark.parametrize(
+    "item",
+    [
+        9007199254740992,
+        [1, -9007199254740992],
+        {9007199254740992: "key"},
+        # Integers with as many digits as oversized ones and things that look
+        # like them are false positives.
+        [9007199254740991, 9007199254740992.5, "9007199254740992"],
+    ],
+)
+def test_may_contain_oversized_integer_true(item: Any) -> None:
+    json_str = json.dumps(item)
+    assert zu.may_contain_oversized_integer(json_str)
+    assert zu.may_contain_oversized_integer(json_str.encode())
+
+
+@pytest.mark.parametrize(
+    "json_str",
+    [
+        '{"x": [1, 2.5, -3], "y": "text"}',
+        '{"x": [1, 2.5, -9007199254740991], "y": "99999999999999999999"}',
+        '{"x": [1, 2.5, 9007199254740992], "y": {"z": [-28000000000000000]}}',
+        b'{"x": [NaN, 9007199254740992]}',
+    ],
+)
+def test_parse_json(json_str: str | bytes) -> None:
+    value = zu.parse_json(json_str)
+    expected = json.loads(json_str, parse_int=zu.safe_parse_int)
+    assert json.dumps(value) == json.dumps(expected)
+    assert list(map(type, value["x"])) == list(map(type, expected["x"]))
@@ -17,12 +17,15 @@
 # Exceptions are not caught and so will trigger a process exit with non-zero exit code (signaling an error)
 
 import base64
+import contextlib
 import copy
+import functools
+import gc
 import io
 import json
 import os
+import pathlib
 import signal
-import subprocess
 import sys
 import time
 import types
@@ -32,12 +35,49 @@ from importlib.abc import MetaPathFinder
 from inspect import signature
 from typing import Any
 
+import prairielearn.internal.calculation_worker as cw
+import prairielearn.internal.call_timings as ct
+import prairielearn.internal.code_cache as cc
+import prairielearn.internal.sampling_profiler as sp
 import prairielearn.internal.zygote_utils as zu
 
 saved_path = copy.copy(sys.path)
 
 drop_privileges = int(os.environ.get("DROP_PRIVILEGES", "0")) == 1
 
+# When greater than zero, the zygote keeps this many workers pre-forked and
+# parked so that a `restart` can hand control to one of them immediately.
+worker_pool_size = int(os.environ.get("ZYGOTE_WORKER_POOL_SIZE", "0"))
+
+# Once a worker has handled this many calls or its RSS has grown past this
+# many megabytes, its responses include a `recycle` hint that asks the caller
+# to restart it. Zero disables the corresponding threshold.
+recycle_max_calls = int(os.environ.get("ZYGOTE_RECYCLE_MAX_CALLS", "0"))
+recycle_max_rss_mb = int(os.environ.get("ZYGOTE_RECYCLE_MAX_RSS_MB", "0"))
+
+# When greater than one, elements that declare themselves render-pure are
+# rendered in up to this many forked helper processes per `render` call.
+render_processes = int(os.environ.get("ZYGOTE_RENDER_PROCESSES", "0"))
+
+# Each worker runs legacy v2 questions in a Node process that it keeps for all
+# of its v2 calls. If this is set, the worker starts that process as soon as
+# it's forked, so that Node has booted by the time the first call arrives.
+prestart_node = int(os.environ.get("ZYGOTE_PRESTART_NODE", "0")) == 1
+
+# v2 questions always use the root of the PrairieLearn repository as their
+# working directory.
+repository_root_path = pathlib.Path(__file__).resolve().parents[3]
+
+# In copy-on-write-friendly mode, the cyclic garbage collector is disabled
+# while we preload modules, so that freed objects don't leave holes in pages
+# that workers would later fill (and thus copy). Right before each fork, we
+# freeze everything that's been allocated so far; the collector in workers
+# never looks at frozen objects, so it doesn't write to their pages either.
+# See https://docs.python.org/3/library/gc.html#gc.freeze
+gc_freeze = int(os.environ.get("ZYGOTE_GC_FREEZE", "0")) == 1
+if gc_freeze:
+    gc.disable()
+
 # If we're configured to drop privileges (that is, if we're running in a
 # Docker container), various tools like matplotlib and fontconfig will be
 # unable to write to their default config/cache directories. This is because
@@ -120,9 +160,86 @@ import sklearn
 
 mpl.use("PDF")
 
-# Construct initial unit registry to create initial cache file.
+# Construct the shared unit registry, which also creates its cache file, so
+# that every worker inherits it.
 prairielearn.get_unit_registry()
 
+# Compile the core element controllers before forking so that every worker
+# inherits the code objects instead of compiling them again.
+cc.precompile_elements(
+    (pathlib.Path(__file__).parent.resolve().parent / "elements").resolve()
+)
+
+
+def measure_element_load_times(
+    controllers: dict[str, pathlib.Path],
+) -> dict[str, float]:
+    """
+    Measure how long a worker takes to load each element controller on its
+    first use. Each controller is loaded in its own short-lived fork, so that
+    imports shared between controllers are counted for every one of them.
+
+    Returns:
+        A dict mapping element names to load times in milliseconds. Elements
+        that fail to load are omitted.
+    """
+    load_times: dict[str, float] = {}
+    for element_name, element_controller_path in controllers.items():
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            start = time.perf_counter()
+            try:
+                question_phases.load_core_element_controller(element_controller_path)
+            except Exception:
+                os._exit(1)
+            os.write(write_fd, str((time.perf_counter() - start) * 1000).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd, "rb") as f:
+            result = f.read()
+        os.waitpid(pid, 0)
+        if result:
+            load_times[element_name] = float(result)
+    return load_times
+
+
+# When enabled, also execute the core element controllers before forking.
+# Each worker gets its own copy-on-write copy of the resulting module
+# namespaces, so it can use them immediately and can't affect other workers.
+# In response to `ping`, we report how long importing the question processing
+# code took, and, if asked to, how long loading each controller takes; this
+# is what a worker saves the first time it renders a question that uses
+# those elements. Measuring the controllers takes a fork per element, so it
+# is only done on request.
+preload_report: dict[str, Any] | None = None
+if int(os.environ.get("ZYGOTE_PRELOAD_ELEMENTS", "0")) == 1:
+    import_start = time.perf_counter()
+    from prairielearn.internal import question_phases
+
+    import_ms = (time.perf_counter() - import_start) * 1000
+    core_element_controllers = question_phases.find_core_element_controllers()
+    load_times = None
+    if int(os.environ.get("ZYGOTE_PRELOAD_REPORT", "0")) == 1:
+        load_times = measure_element_load_times(core_element_controllers)
+    preloaded_elements = question_phases.preload_core_elements(core_element_controllers)
+    preload_report = {"question_processing_ms": import_ms}
+    if load_times is not None:
+        preload_report["elements_ms"] = {
+            element_name: load_times[element_name]
+            for element_name in preloaded_elements
+            if element_name in load_times
+        }
+
+# Persist compiled `server.py` files and course element controllers across
+# worker restarts. Workers that have dropped privileges run untrusted course
+# code, which must not be able to plant code objects for other courses, so
+# the on-disk cache is only used when workers are as trusted as the zygote.
+code_cache_dir = os.environ.get("ZYGOTE_CODE_CACHE_DIR")
+if code_cache_dir and not drop_privileges:
+    cc.set_disk_cache_dir(code_cache_dir)
+
 
 # We want to conditionally allow/block importing specific modules.
 # This custom importer will allow us to do so, and throw a custom error message.
@@ -156,7 +273,7 @@ class ForbidModuleMetaPathFinder(MetaPathFinder):
 
 # We want to initialize the Faker seed, but only if faker is loaded
 class FakerInitializeMetaPathFinder(MetaPathFinder):
-    def __init__(self, seed: int) -> None:
+    def __init__(self, seed: int | None) -> None:
         self.seed = seed
 
     def find_spec(
@@ -180,19 +297,27 @@ class FakerInitializeMetaPathFinder(MetaPathFinder):
 # debug the problem.
 def try_dumps(obj: Any, *, sort_keys: bool = False, allow_nan: bool = False) -> str:
     try:
-        zu.assert_all_integers_within_limits(obj)
-        return json.dumps(obj, sort_keys=sort_keys, allow_nan=allow_nan)
+        json_str = json.dumps(obj, sort_keys=sort_keys, allow_nan=allow_nan)
+        # Only look for oversized integers in `obj` if its encoding has any
+        # long runs of digits that might be one.
+        if zu.may_contain_oversized_integer(json_str):
+            zu.assert_all_integers_within_limits(obj)
     except Exception:
         print(f"Error converting this object to json:\n{obj}\n", file=sys.stderr)
         raise
+    return json_str
 
 
 def worker_loop() -> None:
+    global calculation_worker  # noqa: PLW0603
 
-    # The prairielearn.internal module is only needed in the worker process.
-    # Because it makes use of threading, we only import it after forking to
-    # avoid warnings about inheriting threads from the parent process.
+    # The question processing code is only needed in the worker process, so
+    # we normally import it here, after forking. With ZYGOTE_PRELOAD_ELEMENTS,
+    # the zygote has already imported it. That's safe because neither the
+    # import nor executing the core element controllers starts any threads,
+    # which a forked worker wouldn't inherit.
     from prairielearn.internal import question_phases
+    from prairielearn.internal.check_data import all_phases
 
     # Whether the PRNGs have already been seeded in this worker_loop() call
     seeded = False
@@ -207,6 +332,193 @@ def worker_loop() -> None:
     #   specifically for elements that want to maintain a cache of expensive-to-compute data.
     mod_cache: dict[str, dict[str, Any]] = {}
 
+    # If the current request asked for timings, this collects them.
+    timings: ct.CallTimings | None = None
+
+    # If the current request asked to be profiled, this collects the samples.
+    profiler: sp.SamplingProfiler | None = None
+
+    # Whether the current request asked for the worker's memory usage.
+    report_memory = False
+
+    # The number of calls this worker has handled, for deciding when to ask
+    # to be recycled.
+    calls_handled = 0
+
+    def call_function(
+        file: str,
+        fcn: str,
+        args: list[Any],
+        cwd: str,
+        paths: list[str],
+    ) -> tuple[bool, Any]:
+        """
+        Call `fcn` in `file` and return whether the function was present along
+        with its return value, without serializing anything.
+
+        Raises:
+            ValueError: If `file` is `question.html` and `fcn` isn't a question phase.
+        """
+        nonlocal seeded
+
+        # Here, we re-seed the PRNGs if not already seeded in this worker_loop() call.
+        # We only want to seed the PRNGs once per worker_loop() call, so that if a
+        # question happens to contain multiple occurrences of the same element, the
+        # randomizations for each occurrence are independent of each other but still
+        # dependent on the variant seed.
+        if type(args[-1]) is dict and not seeded:
+            variant_seed = args[-1].get("variant_seed", None)
+            random.seed(variant_seed)
+            np.random.seed(variant_seed)
+            sys.meta_path.insert(0, FakerInitializeMetaPathFinder(variant_seed))
+            seeded = True
+
+        # reset and then set up the path
+        sys.path = copy.copy(saved_path)
+        for path in reversed(paths):
+            sys.path.insert(0, path)
+        sys.path.insert(0, cwd)
+
+        # change to the desired working directory
+        os.chdir(cwd)
+
+        if file == "question.html":
+            # This is an experimental implementation of question processing
+            # that does all HTML parsing and rendering in Python. This should
+            # be much faster than the current implementation that does an IPC
+            # call for each element.
+
+            context = args[0]
+            data = args[1]
+
+            if fcn not in all_phases:
+                raise ValueError(f"Unknown question phase: {fcn}")
+
+            result, processed_elements = question_phases.process(
+                fcn,
+                data,
+                context,
+                timings=timings,
+                render_processes=render_processes,
+            )
+            return True, {
+                "html": result if fcn == "render" else None,
+                "file": result if fcn == "file" else None,
+                "data": data,
+                "processed_elements": list(processed_elements),
+            }
+
+        file_path = os.path.join(cwd, file + ".py")
+
+        mod = mod_cache.get(file_path)
+        if mod is None:
+            with ct.measure(timings, "module_load"):
+                mod = {}
+                exec(cc.compile_file(file_path), mod)
+            mod_cache[file_path] = mod
+
+        # try to load and execute the desired function
+        method = zu.get_module_function(mod, fcn)
+        if method is not None:
+            # check if the desired function is a legacy element function - if
+            # so, we add an argument for element_index
+            arg_names = list(signature(method).parameters.keys())
+            if arg_names == ["element_html", "element_index", "data"]:
+                args.insert(1, None)
+
+            # call the desired function in the loaded module
+            with ct.measure(timings, "function"):
+                val = method(*args)
+
+            if fcn == "file":
+                # if val is None, replace it with empty string
+                if val is None:
+                    val = ""
+                # if val is a file-like object, read whatever is inside
+                if isinstance(val, io.IOBase):
+                    val.seek(0)
+                    val = val.read()
+                # if val is a string, treat it as utf-8
+                if isinstance(val, str):
+                    val = bytes(val, "utf-8")
+                # if this next call does not work, it will throw an error, because
+                # the thing returned by file() does not have the correct format
+                val = base64.b64encode(val).decode()
+
+            # Any function that is not 'file' or 'render' will modify 'data' and
+            # should not be returning anything (because 'data' is mutable).
+            if fcn not in ("file", "render"):
+                if val is None:
+                    val = args[-1]
+                if val is not args[-1]:
+                    # We'll only actually complain if the function returned
+                    # a completely different object than the one passed in.
+                    # Otherwise, we'll just silently ignore the return value
+                    # and use the passed-in object (which should in fact be
+                    # the same object).
+                    #
+                    # TODO: Once this has been running in production for a while,
+                    # change this to raise an exception.
+                    sys.stderr.write(
+                        f"Function {fcn}() in {file + '.py'} returned a data object other than the one that was passed in.\n\n"
+                        + "There is no need to return a value, as the data object is mutable and can be modified in place.\n\n"
+                        + "For now, the return value will be used instead of the data object that was passed in.\n\n"
+                        + "In the future, returning a different object will trigger a fatal error."
+                    )
+            return True, val
+
+        # the function wasn't present, so report this
+        return False, None
+
+    def encode_call_response(response: dict[str, Any]) -> str:
+        """
+        Encode the response to a call, adding the memory usage, profile, and
+        timings if the request asked for them, and a recycle hint if the
+        worker has crossed one of its thresholds.
+
+        Returns:
+            The encoded response.
+        """
+        recycle_reasons = []
+        if recycle_max_calls > 0 and calls_handled >= recycle_max_calls:
+            recycle_reasons.append("calls")
+        if recycle_max_rss_mb > 0:
+            rss = ct.current_rss()
+            if rss >= recycle_max_rss_mb * 1024 * 1024:
+                recycle_reasons.append("rss")
+        if recycle_reasons:
+            response["recycle"] = {"reasons": recycle_reasons, "calls": calls_handled}
+
+        if report_memory:
+            response["memory"] = ct.memory_usage()
+            if gc_freeze:
+                response["memory"]["frozen_objects"] = gc.get_freeze_count()
+            # SymPy is only imported by questions that use it.
+            psu = sys.modules.get("prairielearn.sympy_utils")
+            if psu is not None:
+                response["memory"]["sympy_parse_cache"] = psu.parse_cache_stats()
+
+        if profiler is not None:
+            stacks, truncated = profiler.collapsed_stacks()
+            response["profile"] = {
+                "interval_ms": profiler.interval * 1000,
+                "samples": profiler.counts.total(),
+                "cpu_ms": profiler.cpu_time * 1000,
+                "truncated": truncated,
+                "stacks": stacks,
+            }
+
+        if timings is None:
+            return try_dumps(response)
+
+        with timings.measure("json_encode"):
+            json_outp = try_dumps(response)
+        # The timings can only be encoded once everything else has been, so
+        # we splice them into the encoded object as its last key.
+        return (
+            json_outp.removesuffix("}") + f',"timings":{try_dumps(timings.to_dict())}}}'
+        )
+
     # file descriptor 3 is for output data
     with open(3, "w", encoding="utf-8") as outf:
         # Infinite loop where we wait for an input command, do it, and
@@ -226,11 +538,29 @@ def worker_loop() -> None:
                 sys.exit(1)
 
             # Unpack the input line as JSON. If that fails, log the line for debugging.
+            decode_start = time.perf_counter()
             try:
-                inp = json.loads(json_inp, parse_int=zu.safe_parse_int)
+                inp = zu.parse_json(json_inp)
             except json.JSONDecodeError as exc:
                 raise ValueError(f"Error decoding JSON input: {json_inp}") from exc
 
+            # Requests may ask for a breakdown of where time went during the
+            # call, which is added to the response as `timings`.
+            timings = None
+            if inp.get("timings", False) is True:
+                timings = ct.CallTimings(start=decode_start)
+                timings.add("json_decode", (time.perf_counter() - decode_start) * 1000)
+
+            # Requests may also ask to run under a sampling profiler, whose
+            # collapsed stacks are added to the response as `profile`.
+            profiler = None
+            if inp.get("profile", False) is True:
+                profiler = sp.SamplingProfiler()
+
+            # Requests, including `ping`, may also ask for the worker's
+            # memory usage, which is added to the response as `memory`.
+            report_memory = inp.get("memory", False) is True
+
             # Get the contents of the JSON input
             file = inp.get("file", None)
             fcn = inp.get("fcn", None)
@@ -248,7 +578,10 @@ def worker_loop() -> None:
             # will use to check if the worker is active and able to respond to
             # calls. We just reply with "pong" to indicate that we're alive.
             if file is None and fcn == "ping":
-                json.dump({"present": True, "val": "pong"}, outf)
+                pong: dict[str, Any] = {"present": True, "val": "pong"}
+                if preload_report is not None:
+                    pong["preload"] = preload_report
+                outf.write(encode_call_response(pong))
                 outf.write("\n")
                 outf.flush()
                 continue
@@ -269,259 +602,338 @@ def worker_loop() -> None:
                 # since it will immediately terminate the process - in our case, we don't
                 # care about graceful termination, we just want to get out of here as
                 # fast as possible.
+                #
+                # When running in the zygote's warm pool, let the zygote know
+                # that it can hand control to the next worker right away.
+                if handback_fd is not None:
+                    os.write(handback_fd, b"\0")
                 os._exit(0)
 
+            if not isinstance(file, str):
+                raise TypeError(f"Expected a file name, got: {file!r}")
+
             if file.endswith(".js"):
                 # We've shoehorned legacy v2 questions into the v3 code caller
                 # so that we can reuse the same worker processes, and specifically
                 # so that we can reuse the container pool.
                 #
                 # Node doesn't support POSIX-style forks, so we can't use a zygote
-                # process like we do with Python. Instead, we'll exec a Node subprocess.
-                # Node generally boots up very quickly, so this should be fine.
-                result = subprocess.run(
-                    [
-                        "node",
-                        "./apps/prairielearn/dist/question-servers/calculation-worker.js",
-                    ],
-                    cwd=cwd,
-                    capture_output=True,
-                    # By convention, the first argument is an object that contains all
-                    # the call information.
-                    input=json.dumps(args[0]),
-                    encoding="utf-8",
-                    check=False,
-                )
-
-                # Proxy any output from the subprocess back to the caller.
-                # Note that we only deal with stderr, as the Node process rewrote
-                # the output streams so that writes to stdout actually go to stderr.
-                # This allows us to use stdout for the actual return value.
-                if result.stderr:
-                    print(result.stderr, file=sys.stderr)
-                    sys.stderr.flush()
-
-                # If the subprocess exited with a non-zero exit code, raise an exception.
-                result.check_returncode()
-
-                outf.write(result.stdout)
+                # process like we do with Python. Instead, we'll keep a Node
+                # subprocess around for all of this worker's v2 calls. It exits
+                # along with the worker on `restart`.
+                if calculation_worker is None or not calculation_worker.is_usable(cwd):
+                    if calculation_worker is not None:
+                        calculation_worker.close()
+                    calculation_worker = cw.CalculationWorker(cwd)
+
+                # By convention, the first argument is an object that contains all
+                # the call information. If the subprocess exits instead of
+                # responding, this raises an exception.
+                calls_handled += 1
+                with ct.measure(timings, "function"):
+                    response = zu.parse_json(calculation_worker.call(args[0]))
+                outf.write(encode_call_response(response))
                 outf.write("\n")
                 outf.flush()
                 continue
 
-            # Here, we re-seed the PRNGs if not already seeded in this worker_loop() call.
-            # We only want to seed the PRNGs once per worker_loop() call, so that if a
-            # question happens to contain multiple occurrences of the same element, the
-            # randomizations for each occurrence are independent of each other but still
-            # dependent on the variant seed.
-            if type(args[-1]) is dict and not seeded:
-                variant_seed = args[-1].get("variant_seed", None)
-                random.seed(variant_seed)
-                np.random.seed(variant_seed)
-                sys.meta_path.insert(0, FakerInitializeMetaPathFinder(variant_seed))
-                seeded = True
-
-            # reset and then set up the path
-            sys.path = copy.copy(saved_path)
-            for path in reversed(paths):
-                sys.path.insert(0, path)
-            sys.path.insert(0, cwd)
-
-            # change to the desired working directory
-            os.chdir(cwd)
-
-            if file == "question.html":
-                # This is an experimental implementation of question processing
-                # that does all HTML parsing and rendering in Python. This should
-                # be much faster than the current implementation that does an IPC
-                # call for each element.
-
-                context = args[0]
-                data = args[1]
-
-                result, processed_elements = question_phases.process(fcn, data, context)
-                val = {
-                    "html": result if fcn == "render" else None,
-                    "file": result if fcn == "file" else None,
-                    "data": data,
-                    "processed_elements": list(processed_elements),
-                }
-
-                # make sure all output streams are flushed
-                sys.stderr.flush()
-                sys.stdout.flush()
-
-                # write the return value (JSON on a single line)
-                outf.write(try_dumps({"present": True, "val": val}))
-                outf.write("\n")
-                outf.flush()
-
-                continue
-
-            file_path = os.path.join(cwd, file + ".py")
-
-            mod = mod_cache.get(file_path)
-            if mod is None:
-                mod = {}
-
-                with open(file_path, encoding="utf-8") as inf:
-                    # Use `compile` to associate filename with code object, so the
-                    # filename appears in the traceback if there is an error:
-                    # https://stackoverflow.com/a/437857
-                    code = compile(inf.read(), file_path, "exec")
-
-                exec(code, mod)
-                mod_cache[file_path] = mod
-
-            # try to load and execute the desired function
-            method = zu.get_module_function(mod, fcn)
-            if method is not None:
-                # check if the desired function is a legacy element function - if
-                # so, we add an argument for element_index
-                arg_names = list(signature(method).parameters.keys())
-                if arg_names == ["element_html", "element_index", "data"]:
-                    args.insert(1, None)
-
-                # call the desired function in the loaded module
-                val = method(*args)
-
-                if fcn == "file":
-                    # if val is None, replace it with empty string
-                    if val is None:
-                        val = ""
-                    # if val is a file-like object, read whatever is inside
-                    if isinstance(val, io.IOBase):
-                        val.seek(0)
-                        val = val.read()
-                    # if val is a string, treat it as utf-8
-                    if isinstance(val, str):
-                        val = bytes(val, "utf-8")
-                    # if this next call does not work, it will throw an error, because
-                    # the thing returned by file() does not have the correct format
-                    val = base64.b64encode(val).decode()
-
-                # Any function that is not 'file' or 'render' will modify 'data' and
-                # should not be returning anything (because 'data' is mutable).
-                if fcn not in ("file", "render"):
-                    if val is None or val is args[-1]:
-                        json_outp = try_dumps(
-                            {"present": True, "val": args[-1]}, allow_nan=False
-                        )
-                    else:
-                        json_outp = try_dumps(
-                            {"present": True, "val": val}, allow_nan=False
-                        )
-
-                        # We'll only actually complain if the function returned
-                        # a completely different object than the one passed in.
-                        # Otherwise, we'll just silently ignore the return value
-                        # and use the passed-in object (which should in fact be
-                        # the same object).
-                        #
-                        # TODO: Once this has been running in production for a while,
-                        # change this to raise an exception.
-                        sys.stderr.write(
-                            f"Function {fcn}() in {file + '.py'} returned a data object other than the one that was passed in.\n\n"
-                            + "There is no need to return a value, as the data object is mutable and can be modified in place.\n\n"
-                            + "For now, the return value will be used instead of the data object that was passed in.\n\n"
-                            + "In the future, returning a different object will trigger a fatal error."
-                        )
-                else:
-                    json_outp = try_dumps(
-                        {"present": True, "val": val}, allow_nan=False
-                    )
-            else:
-                # the function wasn't present, so report this
-                json_outp = try_dumps({"present": False}, allow_nan=False)
+            calls_handled += 1
+            call = functools.partial(call_function, file, fcn, args, cwd, paths)
+            present, val = call() if profiler is None else profiler.run(call)
 
             # make sure all output streams are flushed
             sys.stderr.flush()
             sys.stdout.flush()
 
             # write the return value (JSON on a single line)
-            outf.write(json_outp)
+            outf.write(
+                encode_call_response(
+                    {"present": True, "val": val} if present else {"present": False}
+                )
+            )
             outf.write("\n")
             outf.flush()
 
 
 worker_pid = 0
 
+# Pre-forked workers that are parked and waiting to be handed control. Maps
+# each worker's PID to the zygote's ends of its activation and handback pipes.
+parked_workers: dict[int, tuple[int, int]] = {}
 
-def terminate_worker(_signum: int, _stack: types.FrameType | None) -> None:
+# In a worker started by the warm pool, this is the pipe used to tell the zygote
+# that the worker is about to exit and the next one can take over.
+handback_fd: int | None = None
+
+# In a worker, the Node process that runs legacy v2 questions, once started.
+calculation_worker: cw.CalculationWorker | None = None
+
+# Counters that are reported back to the caller on file descriptor 4 when the
+# warm pool is enabled.
+pool_stats = {"size": worker_pool_size, "handoffs": 0, "dry": 0}
+
+
+def kill_workers() -> None:
     if worker_pid > 0:
         os.kill(worker_pid, signal.SIGKILL)
+    for pid in parked_workers:
+        os.kill(pid, signal.SIGKILL)
+
+
+def terminate_worker(_signum: int, _stack: types.FrameType | None) -> None:
+    kill_workers()
     os._exit(0)
 
 
 signal.signal(signal.SIGTERM, terminate_worker)
 signal.signal(signal.SIGINT, terminate_worker)  # Ctrl-C case
 
-with open(4, "w", encoding="utf-8") as exitf:
-    while True:
-        worker_pid = os.fork()
-        if worker_pid == 0:
-            # Ensure that no code running in the worker can interact with
-            # file descriptor 4
-            exitf.close()
-
-            # If configured to do so, drop to a deprivileged user before running
-            # any user code. This should generally only be enabled when running
-            # in Docker, as the `prairielearn/executor` image will be guaranteed
-            # to have the user that we drop to.
-            if drop_privileges:
-                import pwd
 
-                user = pwd.getpwnam("executor")
-                os.setgid(user.pw_gid)
-                os.setuid(user.pw_uid)
+def run_worker(
+    exitf: io.TextIOWrapper,
+    activation_fd: int | None = None,
+    worker_handback_fd: int | None = None,
+    zygote_fds: Iterable[int] = (),
+) -> None:
+    global worker_pid, handback_fd  # noqa: PLW0603
+
+    # Ensure that no code running in the worker can interact with
+    # file descriptor 4
+    exitf.close()
+
+    # The worker must not be able to activate (or hold open) any of the
+    # other workers. It also shouldn't try to kill any of them from the
+    # inherited signal handlers.
+    for fd in zygote_fds:
+        os.close(fd)
+    parked_workers.clear()
+    worker_pid = 0
+    handback_fd = worker_handback_fd
+
+    if activation_fd is not None:
+        # Parked workers keep the zygote's privileges until they're handed
+        # control. Otherwise they'd run as the same `executor` user as the
+        # active worker, whose untrusted code could then tamper with them.
+        if prestart_node and not drop_privileges:
+            start_calculation_worker()
+
+        # Park until the zygote hands us control. Reading EOF means that the
+        # zygote went away before that happened, so there's nothing to do.
+        if os.read(activation_fd, 1) == b"":
+            os._exit(1)
+        os.close(activation_fd)
+
+    # If configured to do so, drop to a deprivileged user before running
+    # any user code. This should generally only be enabled when running
+    # in Docker, as the `prairielearn/executor` image will be guaranteed
+    # to have the user that we drop to.
+    if drop_privileges:
+        import pwd
+
+        user = pwd.getpwnam("executor")
+        os.setgid(user.pw_gid)
+        os.setuid(user.pw_uid)
+
+    if prestart_node and calculation_worker is None:
+        start_calculation_worker()
+
+    worker_loop()
+
+
+def start_calculation_worker() -> None:
+    global calculation_worker  # noqa: PLW0603
+
+    # If Node can't be started, we'll find out when a v2 call needs it.
+    with contextlib.suppress(OSError):
+        calculation_worker = cw.CalculationWorker(repository_root_path)
+
+
+def fork_worker() -> int:
+    """
+    Fork a worker, freezing the zygote's heap first if we're running in
+    copy-on-write-friendly mode.
+
+    Returns:
+        The worker's PID in the zygote, or 0 in the worker.
+    """
+    if gc_freeze:
+        gc.freeze()
+    pid = os.fork()
+    if pid == 0 and gc_freeze:
+        gc.enable()
+    return pid
+
+
+def fork_pool_worker(
+    exitf: io.TextIOWrapper, *, park: bool, active_handback_r: int = -1
+) -> tuple[int, int, int]:
+    """
+    Fork a worker for the warm pool. Returns the worker's PID, the write end of
+    its activation pipe (or -1 if it was started active), and the read end of
+    its handback pipe. `active_handback_r` is the read end of the active
+    worker's handback pipe, which the new worker must not hold open.
+    """
+    activation_r, activation_w = os.pipe() if park else (-1, -1)
+    handback_r, handback_w = os.pipe()
+    zygote_fds = [
+        fd
+        for fds in (
+            *parked_workers.values(),
+            (activation_w, handback_r, active_handback_r),
+        )
+        for fd in fds
+        if fd >= 0
+    ]
+    pid = fork_worker()
+    if pid == 0:
+        run_worker(
+            exitf,
+            activation_r if park else None,
+            handback_w,
+            zygote_fds=zygote_fds,
+        )
+        os._exit(1)
+    if park:
+        os.close(activation_r)
+    os.close(handback_w)
+    return pid, activation_w, handback_r
+
+
+def activate_worker(exitf: io.TextIOWrapper) -> tuple[int, int]:
+    """
+    Hand control to a parked worker, forking a fresh one if none is available.
+    Returns the worker's PID and the read end of its handback pipe.
+    """
+    pool_stats["handoffs"] += 1
+    while parked_workers:
+        pid, (activation_w, handback_r) = parked_workers.popitem()
+        try:
+            # A parked worker should never exit on its own; if it did, reap it
+            # and try the next one.
+            if os.waitpid(pid, os.WNOHANG) == (0, 0):
+                os.write(activation_w, b"\0")
+                return pid, handback_r
+        except (BrokenPipeError, ChildProcessError):
+            pass
+        finally:
+            os.close(activation_w)
+        os.close(handback_r)
+
+    pool_stats["dry"] += 1
+    pid, _, handback_r = fork_pool_worker(exitf, park=False)
+    return pid, handback_r
+
+
+def kill_executor_processes() -> None:
+    """
+    Kill all processes started by `executor`, once the worker that ran as that
+    user has exited.
+
+    Raises:
+        RuntimeError: If processes belonging to `executor` survive being killed.
+    """
+    os.system("pkill -u executor --signal SIGKILL")
+
+    # Check that all processes are gone, giving them a moment to die. If
+    # they're not, that probably means that someone is trying to escape by
+    # repeatedly forking. In that case, we'll refuse to write an exit
+    # confirmation to FD 4. This process will be killed, and if we're running
+    # inside a Docker container, the entire container should be killed too.
+    #
+    # Processes that were reparented to init stay around as zombies until it
+    # reaps them, but they can't run anything anymore.
+    import psutil
+
+    deadline = time.monotonic() + 1
+    while any(
+        p.info["username"] == "executor" and p.info["status"] != psutil.STATUS_ZOMBIE
+        for p in psutil.process_iter(["username", "status"])
+    ):
+        if time.monotonic() > deadline:
+            raise RuntimeError("found remaining processes belonging to executor user")
+        time.sleep(0.01)
+
+
+def wait_for_worker(pid: int) -> None:
+    _, status = os.waitpid(pid, 0)
+    if not os.WIFEXITED(status) or os.WEXITSTATUS(status) != 0:
+        # The worker did not exit gracefully, or something else happened
+        # that is weird
+        raise RuntimeError(f"worker process exited unexpectedly with status {status}")
+
+
+def confirm_exit(exitf: io.TextIOWrapper) -> None:
+    # We'll need to write a confirmation message on file
+    # descriptor 4 so that PL knows that control was actually
+    # returned to the zygote.
+    if worker_pool_size > 0:
+        json.dump({"exited": True, "pool": pool_stats}, exitf)
+    else:
+        json.dump({"exited": True}, exitf)
+    exitf.write("\n")
+    exitf.flush()
+
 
-            worker_loop()
+with open(4, "w", encoding="utf-8") as exitf:
+    if worker_pool_size > 0:
+        # Warm pool mode: keep `worker_pool_size` workers forked and parked so
+        # that a restart only has to hand control to one of them. Without
+        # `DROP_PRIVILEGES`, reaping the previous worker happens after the
+        # caller has been told that the restart is complete. With it, the
+        # previous worker and everything it started have to be gone before the
+        # next worker drops to the `executor` user.
+        worker_pid, worker_handback_r = activate_worker(exitf)
+        # The initial activation isn't a restart.
+        pool_stats["handoffs"] = pool_stats["dry"] = 0
 
+        while True:
+            while len(parked_workers) < worker_pool_size:
+                pid, activation_w, handback_r = fork_pool_worker(
+                    exitf, park=True, active_handback_r=worker_handback_r
+                )
+                parked_workers[pid] = (activation_w, handback_r)
+
+            # The worker writes a byte here right before it exits in response
+            # to `restart`. If it dies any other way, we'll see EOF instead.
+            handed_back = os.read(worker_handback_r, 1) != b""
+            os.close(worker_handback_r)
+            if drop_privileges or not handed_back:
+                # If this raises, the parked workers will see EOF on their
+                # activation pipes once this process exits and will exit too.
+                wait_for_worker(worker_pid)
+                worker_pid = 0
+                if drop_privileges:
+                    kill_executor_processes()
+
+            previous_worker_pid = worker_pid
+            worker_pid, worker_handback_r = activate_worker(exitf)
+            confirm_exit(exitf)
+
+            if previous_worker_pid > 0:
+                try:
+                    wait_for_worker(previous_worker_pid)
+                except RuntimeError:
+                    # We've already confirmed the restart, so we can't refuse
+                    # to do so like the non-pool path does. Instead, take down
+                    # every worker; the caller will see this zygote exit.
+                    kill_workers()
+                    raise
+
+    while True:
+        worker_pid = fork_worker()
+        if worker_pid == 0:
+            run_worker(exitf)
             break
         else:
-            pid, status = os.waitpid(worker_pid, 0)
+            wait_for_worker(worker_pid)
             worker_pid = 0
-            if os.WIFEXITED(status):
-                if os.WEXITSTATUS(status) == 0:
-                    # Everything is ok, the worker exited gracefully,
-                    # just repeat
-
-                    exited = True
-
-                    # Once this child exits, clean up after it if we
-                    # were running as the `executor` user
-                    if drop_privileges:
-                        # Kill all processes started by `executor`.
-                        os.system("pkill -u executor --signal SIGKILL")
-
-                        # Check that all processes are gone. If they're not,
-                        # that probably means that someone is trying to escape
-                        # by repeatedly forking. In that case, we'll refuse to
-                        # write an exit confirmation to FD 4. This process will
-                        # be killed, and if we're running inside a Docker container,
-                        # the entire container should be killed too.
-                        import psutil
-
-                        if any(
-                            p.username() == "executor" for p in psutil.process_iter()
-                        ):
-                            raise RuntimeError(
-                                "found remaining processes belonging to executor user"
-                            )
-
-                    # We'll need to write a confirmation message on file
-                    # descriptor 4 so that PL knows that control was actually
-                    # returned to the zygote.
-                    json.dump({"exited": True}, exitf)
-                    exitf.write("\n")
-                    exitf.flush()
-                else:
-                    # The worker did not exit gracefully
-                    raise RuntimeError(
-                        f"worker process exited unexpectedly with status {status}"
-                    )
-            else:
-                # Something else happened that is weird
-                raise RuntimeError(
-                    f"worker process exited unexpectedly with status {status}"
-                )
+
+            # Everything is ok, the worker exited gracefully,
+            # just repeat
+
+            # Once this child exits, clean up after it if we
+            # were running as the `executor` user
+            if drop_privileges:
+                kill_executor_processes()
+
+            confirm_exit(exitf)
@@ -3,7 +3,8 @@
 // This is meant to be invoked from a Python code caller via `lib/code-caller`.
 // This allows us to isolate code from the main process that's handling requests,
 // and to execute code inside Docker containers in environments where
-// containerized code execution is enabled.
+// containerized code execution is enabled. Each Python worker starts one of
+// these and reuses it for all of its calls until the worker itself exits.
 //
 // It's important that nothing in this file relies on config or other global
 // server state, as this won't be executed in the main process.
@@ -15,7 +16,7 @@
 
 import assert from 'node:assert';
 import * as path from 'node:path';
-import { type Interface, createInterface } from 'node:readline';
+import { createInterface } from 'node:readline';
 
 import { type Question, type Submission, type Variant } from '../lib/db-types.js';
 import requireFrontend from '../lib/require-frontend.js';
@@ -132,45 +133,7 @@ function grade(
   };
 }
 
-function getLineOnce(rl: Interface): Promise<string | null> {
-  return new Promise((resolve) => {
-    let didResolve = false;
-    rl.on('line', (line) => {
-      if (didResolve) return;
-      didResolve = true;
-      resolve(line);
-    });
-    rl.on('close', () => {
-      if (didResolve) return;
-      didResolve = true;
-      resolve(null);
-    });
-  });
-}
-
-// Redirect `stdout` to `stderr` so that we can ensure that no
-// user code can write to `stdout`; we need to use `stdout` to send results
-// instead.
-const stdoutWrite = process.stdout.write.bind(process.stdout);
-process.stdout.write = process.stderr.write.bind(process.stderr);
-
-(async () => {
-  const rl = createInterface({
-    input: process.stdin,
-    output: process.stdout,
-  });
-
-  const line = await getLineOnce(rl);
-
-  if (!line) {
-    throw new Error('Did not get data from parent process');
-  }
-
-  // Close the reader to empty the event loop.
-  rl.close();
-
-  const input = JSON.parse(line);
-
+async function handleRequest(input: any): Promise<Record<string, any>> {
   const {
     // These first four are required.
     questionServerPath,
@@ -187,22 +150,41 @@ process.stdout.write = process.stderr.write.bind(process.stderr);
 
   const server = await loadServer(questionServerPath, coursePath);
 
-  let data: Record<string, any>;
   if (func === 'generate') {
-    data = generate(server, coursePath, question, variant_seed);
+    return generate(server, coursePath, question, variant_seed);
   } else if (func === 'grade') {
-    data = grade(server, coursePath, submission, variant, question);
+    return grade(server, coursePath, submission, variant, question);
   } else {
     throw new Error(`Unknown function: ${func}`);
   }
+}
+
+// Redirect `stdout` to `stderr` so that we can ensure that no
+// user code can write to `stdout`; we need to use `stdout` to send results
+// instead.
+const stdoutWrite = process.stdout.write.bind(process.stdout);
+process.stdout.write = process.stderr.write.bind(process.stderr);
+
+(async () => {
+  // The parent process keeps us around for all of its calls, sending one
+  // request per line and expecting one response per line in return. It closes
+  // `stdin` when it's done with us.
+  const rl = createInterface({ input: process.stdin, crlfDelay: Infinity });
 
-  // Write data back to invoking process.
-  stdoutWrite(JSON.stringify({ val: data, present: true }), 'utf-8');
-  stdoutWrite('\n');
+  for await (const line of rl) {
+    if (!line) continue;
+
+    const data = await handleRequest(JSON.parse(line));
+
+    // Write data back to invoking process.
+    stdoutWrite(JSON.stringify({ val: data, present: true }) + '\n', 'utf-8');
+  }
 
   // If we get here, everything went well - exit cleanly.
   process.exit(0);
 })().catch((err) => {
+  // The parent process sees that we exited instead of responding and reports
+  // the error that we printed.
   console.error(err);
   process.exit(1);
 });
@@ -60,6 +60,12 @@ export const ElementCoreJsonSchema = z
     controller: z.string().describe("The name of the element's controller file."),
     dependencies: DependencyJsonSchema.optional(),
     dynamicDependencies: DynamicDependencyJsonSchema.optional(),
+    renderPure: z
+      .boolean()
+      .describe(
+        "Whether the element's render() function only reads `data`, without any other side effects, so that it can be rendered in a separate process.",
+      )
+      .optional(),
     additionalNames: z
       .array(z.string().describe('A name for this element to be used in question HTML files.'))
       .describe('Any additional names to give this element, i.e. for backwards compatibility.')
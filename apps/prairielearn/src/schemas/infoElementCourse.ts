@@ -72,6 +72,12 @@ export const ElementCourseJsonSchema = z
     controller: z.string().describe("The name of the element's controller file."),
     dependencies: DependencyJsonSchema.optional(),
     dynamicDependencies: DynamicDependencyJsonSchema.optional(),
+    renderPure: z
+      .boolean()
+      .describe(
+        "Whether the element's render() function only reads `data`, without any other side effects, so that it can be rendered in a separate process.",
+      )
+      .optional(),
   })
   .strict()
   .describe('Info files for v3 elements.');